@@ -1,17 +1,22 @@
-from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog
-from PySide6.QtGui import QPixmap, QImage, QIcon
-from PySide6.QtCore import QTimer, QRunnable, Slot, QThreadPool
+from PySide6.QtWidgets import QApplication, QMainWindow, QFileDialog, QLabel, QComboBox, QSlider
+from PySide6.QtGui import QImage, QIcon, QPainter
+from PySide6.QtCore import Qt, QTimer, QObject, Signal, QEvent
 from UI.templates.MainWindow import Ui_MainWindow
 
 from threading import Lock
+import os
+import time
 
 from assets.utils import *
 from assets.transformation_functions import SignalTransformer
 from assets.settings import *
-from assets.SignalHandler import SignalHandler
+from assets.SignalHandler import SignalHandler, MODEL_LOADER, WINDOW_CACHE
+from assets.ResultStore import ResultStore
+from assets.Metrics import METRICS
+from assets.SampleClock import SampleClock
+from assets.ComputeWorker import ComputeWorker
 
 import numpy as np
-import cv2
 
 
 
@@ -25,35 +30,109 @@ class UserInterface(QMainWindow, Ui_MainWindow):
         self.setWindowTitle("ECG Anomaly Detection")
 
         self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.loop_handler)
         self.lock = Lock()
         self.signal_handler = None
         self.transformer = SignalTransformer()
-        self.thread_pool = QThreadPool()
+        self.worker = None # compute thread of the signal handler
         self.frame_main = np.ones((HEIGHT, WIDTH, 3), dtype=np.uint8) * 0
 
         self.idx = 1 # frame number
+        self.display_fps = DISPLAY_FPS # repaints per second
+        self.clock = SampleClock(SAMPLING_RATE) # the sample due now, paces the playback to the sampling rate of the record (times the speed)
+        self.wall_clock = SampleClock(SAMPLING_RATE) # the sample due now without the holds of the backpressure, the real-time lag is measured against it
+        self.speed = 1 # playback speed relative to real time, 0 - as fast as possible
+        self.metrics_time = 0.0 # wall clock time of the last metrics panel update and export
+        self.repaint_time = 0.0 # wall clock time of the last repaint
+        self.painted_position = -1 # playhead shown by the last repaint
 
         self._initialize_items()
+        self._start_model_loading()
 
 
 
     def loop_handler(self) -> None:
         """
-        Main loop handler for updating the signal frames.
-        Iterates the signal frames and updates the main and sub images.
+        Main loop handler for updating the signal frames, called at the display rate.
+        Queues as many frames as the sample clock says have elapsed (or the next chunk when playing as fast as possible) to the compute thread
+        and updates the main and sub images once.
+        Backpressure - once the computation falls COMPUTE_MAX_LAG seconds of playback behind, no new frames are queued and the clock is held
+        (the playback slows down to the computation), and the repaints, which compete for the lock, drop to DISPLAY_MIN_FPS.
+        The real-time lag is the playhead behind the wall clock, which is never held, so it keeps growing while the playback is held back.
         Stops the timer if the signal is finished.
         """
-        self.start_computation()
-        with self.lock:
-            self.update_main_image(self.signal_handler.get_signal_frame())
+        backlog = self.worker.backlog
+        behind = backlog > COMPUTE_MAX_LAG * self.clock.fs * (self.speed if self.speed > 0 else 1)
+        if self.speed > 0:
+            if behind:
+                self.clock.start(self.idx) # holding the clock at the last queued frame
+            target_idx = self.clock.now()
+        else:
+            target_idx = self.idx + PLAYBACK_MAX_STEP if backlog < PLAYBACK_MAX_STEP else self.idx
+        if target_idx > self.idx:
+            self.start_computation(target_idx)
+            self.idx = target_idx
+
+        lag = self.wall_clock.lag(self.signal_handler.position) if self.speed > 0 else 0.0 # seconds of the record, no real time to lag behind at the maximal speed
+        METRICS.set_gauge("realtime_lag_seconds", lag) # not a stage latency, so not in the latency histograms
+
+        now = time.perf_counter()
+        if self.signal_handler.position != self.painted_position and (not behind or now - self.repaint_time >= 1 / DISPLAY_MIN_FPS):
+            self.repaint_time = now
+            self.update_views()
+        self.update_metrics()
 
         if not self.__check_signal_status():
             self.timer.stop()
-        
-        if self.signal_handler.sub_signal_frame is not None:
-            self.update_sub_image(self.signal_handler.sub_signal_frame)
-        self.idx += 1
+            self.update_views() # the annotations of the last window
+
+
+
+    def update_views(self) -> None:
+        """
+        Repaints the main and sub images and moves the position slider to the playhead.
+        """
+        self.painted_position = self.signal_handler.position
+        image = self.signal_handler.main_buffers.acquire() # the buffers stay untouched by the compute thread until the next acquire
+        if image is not None:
+            self.update_main_image(image)
+
+        image = self.signal_handler.sub_buffers.acquire()
+        if image is not None:
+            self.update_sub_image(image)
+
+        if not self.slider_position.isSliderDown():
+            self.slider_position.blockSignals(True) # not a seek
+            self.slider_position.setValue(self.signal_handler.position)
+            self.slider_position.blockSignals(False)
+
+
+
+    def seek(self, idx: int) -> None:
+        """
+        Jumps the playback to the given sample, rendering the view at that position right away.
+        """
+        if self.signal_handler is None:
+            return
+        self.worker.seek(idx) # the pending frames are dropped
+        self.idx = self.signal_handler.position + 1
+        if self.clock.running:
+            self._start_clocks()
+        self.update_views()
+
+
+
+    def update_speed(self, index: int) -> None:
+        """
+        Changes the playback speed, going on from the current position (the wall clock keeps the lag accumulated so far).
+        """
+        previous_speed, self.speed = self.speed, PLAYBACK_SPEEDS[index]
+        if self.speed > 0:
+            self.clock.set_speed(self.speed)
+            self.wall_clock.set_speed(self.speed)
+            if previous_speed == 0 and self.clock.running: # the clocks were not followed at the maximal speed
+                self._start_clocks()
 
 
 
@@ -67,52 +146,87 @@ class UserInterface(QMainWindow, Ui_MainWindow):
         dialog.exec()
         if dialog.selectedFiles():
             try:
-                file_name = dialog.selectedFiles()[0].split(".")[0]
-                signal = load_signal_ecg(file_name)
-                self.signal_handler = SignalHandler(signal, self.transformer, self.lock)
+                file_name = os.path.splitext(dialog.selectedFiles()[0])[0]
+                leads = open_leads_ecg(file_name) # read lazily from the memory-mapped record
+                signal = leads[0] # viewed and searched for the beats, all the leads are scored with MULTI_LEAD
+                if self.worker is not None:
+                    self.worker.stop()
+                self.main_painter.clear() # the display buffers of the previous record
+                self.sub_painter.clear()
+                if self.signal_handler is not None and self.signal_handler.result_store is not None:
+                    self.signal_handler.result_store.close()
+                result_store = ResultStore.for_record(file_name, RESULT_STORE_DIR) if RESULT_STORE_DIR is not None else None
+                self.signal_handler = SignalHandler(signal, self.transformer, self.lock, streaming=STREAMING_DENOISING, streaming_peaks=STREAMING_PEAKS,
+                                                    result_store=result_store, record_id=file_name, window_cache=WINDOW_CACHE, display=True, leads=leads if MULTI_LEAD else None)
+                self.worker = ComputeWorker(self.signal_handler, COMPUTE_QUEUE_SIZE)
                 self.idx = 1
-
-                self.bt_start.setEnabled(True)
+                running = self.clock.running
+                fs = record_fs(file_name) # the clocks are locked to the sampling frequency of the new record
+                self.clock, self.wall_clock = SampleClock(fs, self.clock.speed), SampleClock(fs, self.wall_clock.speed)
+                if running:
+                    self._start_clocks()
+                self.slider_position.setRange(1, len(signal) - 1)
+                self.slider_position.setPageStep(WIDTH // int(SCALE_X))
+                self.slider_position.setEnabled(True)
+
+                self.bt_start.setEnabled(MODEL_LOADER.is_ready())
             except Exception as e:
                 print(e)
 
     
 
-    def start_computation(self) -> None:
+    def start_computation(self, stop_idx: int) -> None:
         """
-        Creates and starts a worker for the next frame computation.
+        Queues the computation of the frames up to the given one to the compute thread.
         """
-        worker = ComputeNextFrame(self.signal_handler, self.idx)
-        self.thread_pool.start(worker)
+        self.worker.submit(self.idx, stop_idx)
 
     
 
     def update_main_image(self, image: np.ndarray) -> None:
         """
-        Sets the given image in np.array format to the main frame.
+        Shows the given display buffer (at the size of the main view) in the main frame.
         """
-        image_resized = cv2.resize(image, (self.l_main.width(), self.l_main.height()), interpolation=cv2.INTER_LINEAR)
-        qimage = QImage(image_resized.data, self.l_main.width(), self.l_main.height(), 3 * self.l_main.width(), QImage.Format_RGB888)
-        self.l_main.setPixmap(QPixmap.fromImage(qimage))
+        self.main_painter.show(image)
 
     
 
     def update_sub_image(self, image: np.ndarray) -> None:
         """
-        Sets the given image in np.array format to the sub frame.
+        Shows the given display buffer (at the size of the sub view) in the sub frame.
+        """
+        self.sub_painter.show(image)
+
+
+
+    def update_metrics(self) -> None:
+        """
+        Refreshes the metrics panel of the status bar and exports the metrics to METRICS_PATH, at most every METRICS_INTERVAL seconds.
         """
-        qimage = QImage(image.data, self.l_sub.width(), self.l_sub.height(), 3 * self.l_sub.width(), QImage.Format_RGB888)
-        self.l_sub.setPixmap(QPixmap.fromImage(qimage))
+        now = time.perf_counter()
+        if now - self.metrics_time < METRICS_INTERVAL:
+            return
+        self.metrics_time = now
+
+        self.l_metrics.setText(METRICS.summary(["transform", "peak_search", "inference", "drawing", "signal_drawing", "lock_wait", "repaint"]))
+        if METRICS_PATH is not None:
+            try:
+                METRICS.dump(METRICS_PATH)
+            except OSError as e:
+                print(e)
 
 
 
     def start_signal(self) -> None:
-        self.timer.start(3) # 3 ms interval (should be 2.77 ms for 360 Hz and 864 length signal)
+        self._start_clocks()
+        self.timer.start(int(1000 / self.display_fps)) # repainting at the display rate, the frames follow the sample clock
 
 
 
     def stop_signal(self) -> None:
         self.timer.stop()
+        self.clock.stop()
+        self.wall_clock.stop()
 
 
 
@@ -151,7 +265,10 @@ class UserInterface(QMainWindow, Ui_MainWindow):
         Updates the anomaly detection model threshold.
         """
         new_threshold = DEFAULT_THRESHOLD * (100 + value) / 100
-        self.signal_handler.set_model_threshold(new_threshold)
+        self.signal_handler.set_model_threshold(new_threshold) # re-colors the already scored beats
+
+        if not self.timer.isActive(): # showing the new colors right away also when paused
+            self.update_views()
 
 
 
@@ -192,6 +309,40 @@ class UserInterface(QMainWindow, Ui_MainWindow):
 
 
 
+    def on_model_ready(self) -> None:
+        """
+        Called in the GUI thread once the model has been loaded in the background.
+        """
+        if MODEL_LOADER.error is not None:
+            self.statusBar().showMessage(f"Model loading failed: {MODEL_LOADER.error}")
+            return
+
+        self.statusBar().showMessage("Model ready", 3000)
+        self.bt_start.setEnabled(self.signal_handler is not None)
+
+
+
+    def _start_clocks(self) -> None:
+        """
+        (Re)starts the pacing and the wall clocks from the next frame.
+        """
+        self.clock.start(self.idx)
+        self.wall_clock.start(self.idx)
+
+
+
+    def _start_model_loading(self) -> None:
+        """
+        Starts loading and warming up the model in the background, the UI stays usable in the meantime.
+        """
+        self.statusBar().showMessage("Loading the model...")
+        self.model_ready_notifier = ModelReadyNotifier()
+        self.model_ready_notifier.ready.connect(self.on_model_ready) # queued to the GUI thread
+        MODEL_LOADER.add_ready_callback(self.__notify_model_ready)
+        MODEL_LOADER.start()
+
+
+
     def _initialize_items(self) -> None:
         """
         Initializes the items in the UI.
@@ -215,6 +366,12 @@ class UserInterface(QMainWindow, Ui_MainWindow):
         self.frame_advanced_options.hide()
         self.frame_style.hide()
         self.bt_start.setEnabled(False)
+        self.main_painter = FramePainter(self.l_main) # the views paint the display buffers of the signal handler
+        self.sub_painter = FramePainter(self.l_sub)
+        self.l_metrics = QLabel() # p50/p95 latencies of the stages and the real-time lag
+        self.statusBar().addPermanentWidget(self.l_metrics)
+        self.__initialize_slider_position()
+        self.__initialize_combobox_speed()
 
 
 
@@ -253,6 +410,23 @@ class UserInterface(QMainWindow, Ui_MainWindow):
 
 
     
+    def __initialize_slider_position(self) -> None:
+        self.slider_position = QSlider(Qt.Horizontal, self.centralwidget) # playhead in the record, under the main view
+        self.slider_position.setTracking(False) # seeking once the slider is released
+        self.slider_position.setEnabled(False)
+        self.slider_position.valueChanged.connect(self.seek)
+        self.verticalLayout.insertWidget(self.verticalLayout.indexOf(self.frame_4) + 1, self.slider_position)
+
+
+
+    def __initialize_combobox_speed(self) -> None:
+        self.cb_speed = QComboBox(self.frame_3)
+        self.cb_speed.addItems([f"{speed}x" if speed > 0 else "Max" for speed in PLAYBACK_SPEEDS])
+        self.cb_speed.currentIndexChanged.connect(self.update_speed)
+        self.horizontalLayout_3.addWidget(self.cb_speed)
+
+
+
     def __initialize_combobox_analysis_color(self) -> None:
         self.cb_analysis_color.addItems([*COLORS.keys()])
         self.cb_analysis_color.setCurrentText("Blue")
@@ -260,6 +434,14 @@ class UserInterface(QMainWindow, Ui_MainWindow):
 
     
 
+    def __notify_model_ready(self) -> None:
+        try:
+            self.model_ready_notifier.ready.emit()
+        except RuntimeError: # the window is already closed
+            pass
+
+
+
     def __check_signal_status(self) -> bool:
         return self.signal_handler.run_signal
 
@@ -279,25 +461,54 @@ class UserInterface(QMainWindow, Ui_MainWindow):
 
 
 
-class ComputeNextFrame(QRunnable):
+class ModelReadyNotifier(QObject):
+    """
+    Carries the model loader ready-state from the loading thread to the GUI thread.
+    """
+    ready = Signal()
+
+
+
+
+
+
+class FramePainter(QObject):
     """
-    Worker class for updating the signal frame.
-    Uses QRunnable for multithreading.
-    Simply runs the next frame computation in the signal handler.
+    Paints a display buffer on a label, in place of its pixmap.
+    The QImage of every buffer is created once and wraps the buffer memory, so showing a frame neither copies nor resizes it.
 
     Parameters
     ----------
-    c_object : SignalHandler
-        The signal handler object.
-    idx : int
-        The index of the current frame.
+    label : QLabel
+        The label to paint on.
     """
-    def __init__(self, c_object: SignalHandler, idx: int):
-        super().__init__()
-        self.engine = c_object
-        self.idx = idx
-
-
-    @Slot()
-    def run(self):
-        self.engine.update_signal_frame(self.idx)
\ No newline at end of file
+    def __init__(self, label: QLabel):
+        super().__init__(label)
+        self.label = label
+        self.image = None
+        self._images = {} # QImage wrapping every buffer shown so far, by the buffer id
+        label.installEventFilter(self)
+
+
+    def show(self, buffer: np.ndarray) -> None:
+        if id(buffer) not in self._images: # the buffer is kept with its image, so its id is not reused
+            height, width = buffer.shape[:2]
+            self._images[id(buffer)] = (buffer, QImage(buffer.data, width, height, 3 * width, QImage.Format_RGB888))
+        self.image = self._images[id(buffer)][1]
+        self.label.update()
+
+
+    def clear(self) -> None:
+        self._images.clear()
+        self.image = None
+        self.label.update()
+
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Paint and self.image is not None:
+            with METRICS.timer("repaint"):
+                painter = QPainter(self.label)
+                painter.drawImage(self.label.rect(), self.image)
+                painter.end()
+            return True
+        return False
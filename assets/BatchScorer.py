@@ -0,0 +1,220 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import find_peaks
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator
+
+from assets.transformation_functions import SignalTransformer
+from assets.StreamingDenoiser import StreamingDenoiser
+from assets.StreamingPeakDetector import StreamingPeakDetector
+from assets.ResultStore import ResultStore, result_version
+from assets.settings import *
+from assets.utils import open_signal_ecg
+from models.AnomalyDetector import AnomalyDetector
+
+
+
+class BatchScorer:
+    """
+    Headless scoring of whole ECG records.
+    Finds every beat of the record the same way the live view does (the max_peaks highest peaks of every analysis window of FRAME_SIZE // 2 samples),
+    and scores the beat windows with the model in large batches instead of sample by sample.
+
+    Parameters
+    ----------
+    model : AnomalyDetector
+        The model for anomaly detection.
+    transformer : SignalTransformer
+        The transformer used for the signal windows.
+    threshold : float
+        The anomaly threshold for the reconstruction error.
+    peak_threshold : float
+        The peak height threshold on the normalized analysis window.
+    max_peaks : int
+        The maximal number of the peaks kept in one analysis window (not used by the incremental peak detector).
+    batch_size : int
+        The maximal number of beat windows scored in one forward pass.
+    streaming_peaks : bool
+        Whether to find the beats with the incremental peak detector on the streamed denoised signal,
+        which finds every beat exactly once (also across the analysis window boundaries).
+    store_dir : str
+        The root directory of the per-record result stores, the beats already stored are not scored again. None to not use the stores.
+    """
+
+    def __init__(self, model: AnomalyDetector, transformer: SignalTransformer = None, threshold: float = DEFAULT_THRESHOLD,
+                 peak_threshold: float = DEFAULT_PEAK_THRESHOLD, max_peaks: int = DEFAULT_MAX_PEAKS, batch_size: int = 4096,
+                 streaming_peaks: bool = False, store_dir: str = None):
+        self.model = model
+        self.transformer = transformer if transformer is not None else SignalTransformer()
+        self.threshold = threshold
+        self.peak_threshold = peak_threshold
+        self.max_peaks = max_peaks
+        self.batch_size = batch_size
+        self.streaming_peaks = streaming_peaks
+        self.store_dir = store_dir
+
+        self.window_length = FRAME_SIZE // 2 # length of window to be analyzed in terms of peaks
+
+
+
+    def score_record(self, path: str) -> Dict[str, np.ndarray]:
+        """
+        Opens the record from the given path (.hea without the extension) and scores all of its beats.
+        The record is read lazily from the memory-mapped file, so its length is not limited by the memory.
+        """
+        if self.store_dir is None:
+            return self.score_signal(open_signal_ecg(path))
+
+        store = ResultStore.for_record(path, self.store_dir)
+        try:
+            return self.score_signal(open_signal_ecg(path), store)
+        finally:
+            store.close()
+
+
+
+    def score_signal(self, signal: np.ndarray, store: ResultStore = None) -> Dict[str, np.ndarray]:
+        """
+        Finds and scores every beat of the given signal (array or lazily read ChannelView).
+        The beat windows are extracted and scored batch by batch, so the memory use does not grow with the record length.
+        With a result store, only the beats not stored yet are scored, and their results are appended to the store.
+
+        Returns
+        -------
+        results : Dict[str, np.ndarray]
+            Per-beat "sample" indices, reconstruction "error" and anomaly "flag".
+        """
+        beats = self.find_beats_streaming(signal) if self.streaming_peaks else self.find_beats(signal)
+
+        version = result_version(self.model.model_id, self.transformer.config_id, "windowed") if store is not None else None
+
+        errors = np.empty((len(beats),))
+        for start in range(0, len(beats), self.batch_size):
+            batch = beats[start:start+self.batch_size]
+            batch_errors = errors[start:start+self.batch_size] # view of the batch results
+
+            found = np.zeros((len(batch),), dtype=bool)
+            if store is not None:
+                found, stored_errors, _ = store.lookup(batch, version)
+                batch_errors[found] = stored_errors[found]
+
+            if not np.all(found):
+                _, batch_errors[~found], new_flags = self.model.predict(self.extract_windows(signal, batch[~found]), self.threshold)
+                if store is not None:
+                    store.append(batch[~found], batch_errors[~found], new_flags, version)
+
+        return {"sample": beats, "error": errors, "flag": (errors > self.threshold).astype(int)}
+
+
+
+    def find_beats(self, signal: np.ndarray) -> np.ndarray:
+        """
+        Finds the max_peaks highest peaks of every analysis window and returns their indices in the full signal.
+        The analysis windows are read and transformed in batches of batch_size windows.
+        """
+        n_windows = len(signal) // self.window_length
+
+        beats = []
+        for start in range(0, n_windows, self.batch_size):
+            stop = min(start + self.batch_size, n_windows)
+            analysis_windows = np.asarray(signal[start*self.window_length:stop*self.window_length]).reshape(-1, self.window_length)
+            transformed_windows = self.transformer.transform_batch(analysis_windows)
+            for w, signal_window in enumerate(transformed_windows, start):
+                peaks, properties = find_peaks(signal_window, height=self.peak_threshold, distance=10)
+                peaks = np.sort(peaks[np.argsort(properties["peak_heights"])[-self.max_peaks:]]) # the highest ones, as in the live view
+                beats.extend(w * self.window_length + (self.window_length / FRAME_SIZE * peaks).astype(int))
+
+        beats = np.asarray(beats, dtype=np.int64)
+        return beats[beats > FRAME_SIZE // 2] # the half
+
+
+
+    def find_beats_streaming(self, signal: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+        """
+        Finds the beats with the streaming denoiser and the incremental peak detector, feeding the signal in chunks.
+        """
+        denoiser = StreamingDenoiser(self.transformer.fs, self.transformer.hz_threshold, self.transformer.wiener_size,
+                                     capacity=2*chunk_size, dtype=self.transformer.dtype)
+        peak_detector = StreamingPeakDetector(self.peak_threshold, distance=int(0.2 * self.transformer.fs))
+
+        beats, detected_until = [], 0
+        for start in range(0, len(signal), chunk_size):
+            denoiser.push(signal[start:start+chunk_size])
+            if start + chunk_size >= len(signal):
+                denoiser.flush()
+            beats.append(peak_detector.update(denoiser.get(detected_until, denoiser.available)))
+            detected_until = denoiser.available
+
+        beats = np.concatenate(beats) if beats else np.empty((0,), dtype=np.int64)
+        return beats[beats > FRAME_SIZE // 2] # the half
+
+
+
+    def extract_windows(self, signal: np.ndarray, beats: np.ndarray) -> np.ndarray:
+        """
+        Builds the transformed beat windows (n_beats, FRAME_SIZE) centered at the given (sorted) indices.
+        Only the span of the signal covered by the beats is read.
+        """
+        windows = np.empty((len(beats), FRAME_SIZE), dtype=self.transformer.dtype)
+        if len(beats) == 0:
+            return windows
+
+        full = beats + 432 <= len(signal) # windows not cut by the signal end
+        span_start = beats[0] - 432
+        span = np.asarray(signal[span_start:beats[-1]+432])
+
+        full_idx = np.flatnonzero(full)
+        if len(full_idx) > 0:
+            beat_windows = sliding_window_view(span, FRAME_SIZE)
+            for start in range(0, len(full_idx), self.batch_size):
+                rows = full_idx[start:start+self.batch_size]
+                windows[rows] = self.transformer.transform_batch(beat_windows[beats[rows] - 432 - span_start])
+
+        for i in np.flatnonzero(~full):
+            windows[i] = self.transformer.transform_signal(signal[beats[i]-432:beats[i]+432])
+        return windows
+
+
+
+def write_results_csv(path: str, record: str, results: Dict[str, np.ndarray]) -> None:
+    """
+    Writes the per-beat results to a CSV file.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["record", "sample", "error", "flag"])
+        for sample, error, flag in zip(results["sample"], results["error"], results["flag"]):
+            writer.writerow([record, int(sample), float(error), int(flag)])
+
+
+
+def write_results_ndjson(path: str, record: str, results: Dict[str, np.ndarray]) -> None:
+    """
+    Writes the per-beat results to a newline delimited JSON file.
+    """
+    with open(path, "w") as f:
+        for sample, error, flag in zip(results["sample"], results["error"], results["flag"]):
+            f.write(json.dumps({"record": record, "sample": int(sample), "error": float(error), "flag": int(flag)}) + "\n")
+
+
+
+WRITERS = {"csv": write_results_csv, "ndjson": write_results_ndjson}
+
+
+
+def score_records(scorer: BatchScorer, paths: Iterable[str], output_dir: str, output_format: str = "csv") -> Iterator[str]:
+    """
+    Scores every record from the given paths and writes one result file per record into the output directory.
+    Yields the path of every written file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for path in paths:
+        path = os.path.splitext(path)[0] # not dat but hea and without the extension
+        record = os.path.basename(path)
+
+        results = scorer.score_record(path)
+        output_path = os.path.join(output_dir, f"{record}.{output_format}")
+        WRITERS[output_format](output_path, record, results)
+        yield output_path
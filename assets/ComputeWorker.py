@@ -0,0 +1,121 @@
+import threading
+import traceback
+from collections import deque
+
+from assets.SignalHandler import SignalHandler
+
+
+
+class ComputeWorker:
+    """
+    Single long-lived compute thread of a SignalHandler, fed by a bounded queue of sample ranges.
+    The ranges are computed in order, one analysis window at a time, so a seek or a stop waits for one window at most.
+    A range continuing the last pending one, or any range once the queue is full, is coalesced into the last pending range,
+    so submitting never blocks the GUI thread and no task is allocated per tick; the backlog tells the producer when to slow down.
+
+    Parameters
+    ----------
+    handler : SignalHandler
+        The handler computing the frames.
+    max_pending : int
+        The maximal number of the pending ranges.
+    """
+
+    def __init__(self, handler: SignalHandler, max_pending: int = 8):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.step = handler.window_length # frames computed at once
+
+        self._pending = deque() # [start, stop) ranges not computed yet
+        self._condition = threading.Condition()
+        self._busy = False
+        self._end = 0 # end of the last range taken by the worker
+        self._running = False
+        self._thread = None
+
+
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="compute-worker", daemon=True)
+            self._thread.start()
+
+
+
+    def stop(self) -> None:
+        """
+        Drops the pending ranges and stops the thread after the current window.
+        """
+        if self._thread is not None:
+            with self._condition:
+                self._running = False
+                self._pending.clear()
+                self._condition.notify_all()
+            self._thread.join()
+            self._thread = None
+
+
+
+    def submit(self, start_idx: int, stop_idx: int) -> None:
+        """
+        Queues the frames [start_idx, stop_idx) for computation, merging them into the last pending range if they continue it or the queue is full.
+        """
+        self.start()
+        with self._condition:
+            if self._pending and (len(self._pending) >= self.max_pending or self._pending[-1][1] == start_idx):
+                self._pending[-1][1] = max(self._pending[-1][1], stop_idx)
+            else:
+                self._pending.append([start_idx, stop_idx])
+            self._condition.notify_all()
+
+
+
+    @property
+    def backlog(self) -> int:
+        """
+        Number of the submitted frames not computed yet.
+        """
+        with self._condition:
+            end = self._pending[-1][1] if self._pending else self._end
+        return max(min(end, len(self.handler.signal)) - 1 - self.handler.position, 0)
+
+
+
+    def seek(self, idx: int) -> None:
+        """
+        Drops the pending ranges and moves the handler to the given frame once the current window is computed.
+        """
+        with self._condition:
+            self._pending.clear()
+            while self._busy:
+                self._condition.wait()
+            self.handler.seek(idx) # the worker stays idle while the condition is held
+            self._end = self.handler.position + 1
+
+
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                start_idx, stop_idx = self._pending[0]
+                stop_idx = min(stop_idx, start_idx + self.step)
+                if stop_idx == self._pending[0][1]:
+                    self._pending.popleft()
+                else:
+                    self._pending[0][0] = stop_idx
+                self._end = stop_idx
+                self._busy = True
+
+            try:
+                self.handler.update_signal_range(start_idx, stop_idx)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
@@ -0,0 +1,59 @@
+import numpy as np
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+
+class FrameBuffers:
+    """
+    Handoff of the rendered frames from the compute thread to the GUI without copying.
+    The producer renders into the back buffer, already at the size of the displaying label, and publishes it by swapping it with
+    the ready buffer; the GUI takes the latest published frame by swapping the ready buffer with the front one, which it keeps
+    (wrapped in a QImage) until it takes the next frame. The producer never touches the front buffer and never waits for the GUI
+    to paint - a third buffer instead of a plain double buffer, since Qt paints the front buffer later than the swap.
+    All the buffers are allocated once.
+
+    Parameters
+    ----------
+    height : int
+        The height of the frames.
+    width : int
+        The width of the frames.
+    """
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+
+        self._back, self._ready, self._front = (np.zeros((height, width, 3), dtype=np.uint8) for _ in range(3))
+        self._fresh = False # ready buffer holds a frame not taken by the GUI yet
+        self._published = False # any frame was published
+        self._swap_lock = threading.Lock()
+        self._render_lock = threading.Lock() # one producer at a time (compute thread and GUI re-coloring)
+
+
+
+    @contextmanager
+    def render(self):
+        """
+        Yields the back buffer to draw the next frame into, publishing it at the end of the block.
+        """
+        with self._render_lock:
+            yield self._back
+            with self._swap_lock:
+                self._back, self._ready = self._ready, self._back
+                self._fresh = True
+                self._published = True
+
+
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """
+        Returns the latest published frame, to be kept by the GUI until the next call (None if nothing was published yet).
+        """
+        with self._swap_lock:
+            if self._fresh:
+                self._front, self._ready = self._ready, self._front
+                self._fresh = False
+            return self._front if self._published else None
@@ -0,0 +1,196 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed buckets (in seconds), in the Prometheus histogram layout.
+    Observing a value is a binary search and two additions, cheap enough for the per-sample hot path.
+
+    Parameters
+    ----------
+    buckets : List[float]
+        The upper bounds of the buckets, in increasing order (the +Inf bucket is implicit).
+    """
+
+    def __init__(self, buckets: List[float]):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1) # per bucket (not cumulative), the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.count += 1
+            self.sum += seconds
+
+
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-quantile by linear interpolation within its bucket (like histogram_quantile of Prometheus).
+        """
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if count == 0:
+            return float("nan")
+
+        rank, cumulative = q * count, 0
+        for i, n in enumerate(counts):
+            if cumulative + n >= rank and n > 0:
+                if i == len(self.buckets): # +Inf bucket, the highest finite bound is the best estimate
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / n
+            cumulative += n
+        return self.buckets[-1]
+
+
+
+    def cumulative_counts(self) -> List[int]:
+        return self.snapshot()[0]
+
+
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        The cumulative bucket counts, the sum and the count, taken together so that they agree with each other.
+        """
+        with self._lock:
+            counts, total_sum, count = list(self.counts), self.sum, self.count
+        cumulative, total = [], 0
+        for n in counts:
+            total += n
+            cumulative.append(total)
+        return cumulative, total_sum, count
+
+
+
+class Metrics:
+    """
+    Registry of the hot-path latency histograms (by stage) and the gauges (e.g. real-time lag) of the live pipeline.
+    Shown in the GUI status panel and exported in the Prometheus text format.
+
+    Parameters
+    ----------
+    buckets : List[float]
+        The latency buckets (in seconds) of all the histograms.
+    """
+
+    BUCKETS = [5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = buckets if buckets is not None else self.BUCKETS
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.gauges: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+
+
+    def histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, LatencyHistogram(self.buckets))
+        return histogram
+
+
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.histogram(stage).observe(seconds)
+
+
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        Times the block into the histogram of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+
+
+    @contextmanager
+    def acquire(self, lock: threading.Lock, stage: str = "lock_wait"):
+        """
+        Acquires the lock for the block, timing the wait for it.
+        """
+        start = time.perf_counter()
+        with lock:
+            self.observe(stage, time.perf_counter() - start)
+            yield
+
+
+
+    def set_gauge(self, name: str, value: float) -> None:
+        self.gauges[name] = value
+
+
+
+    def summary(self, stages: List[str] = None) -> str:
+        """
+        One-line summary of the median and 95th percentile latencies (ms) of the stages and of the gauges, for the status panel.
+        """
+        parts = []
+        for stage in stages if stages is not None else sorted(self.histograms):
+            histogram = self.histograms.get(stage)
+            if histogram is not None and histogram.count > 0:
+                parts.append(f"{stage} {histogram.quantile(0.5) * 1e3:.2f}/{histogram.quantile(0.95) * 1e3:.2f} ms")
+        parts.extend(f"{name} {value:.2f} s" for name, value in sorted(self.gauges.items()))
+        return " | ".join(parts)
+
+
+
+    def to_prometheus(self, prefix: str = "ecg") -> str:
+        """
+        Formats the histograms and the gauges in the Prometheus text exposition format.
+        """
+        name = f"{prefix}_stage_latency_seconds"
+        lines = [f"# HELP {name} Latency of the live pipeline stages.", f"# TYPE {name} histogram"]
+        for stage, histogram in sorted(self.histograms.items()):
+            bounds = [repr(float(bound)) for bound in histogram.buckets] + ["+Inf"]
+            cumulative_counts, total_sum, count = histogram.snapshot()
+            for bound, cumulative in zip(bounds, cumulative_counts):
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total_sum!r}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        for gauge, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {prefix}_{gauge} gauge")
+            lines.append(f"{prefix}_{gauge} {float(value)!r}")
+        return "\n".join(lines) + "\n"
+
+
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the metrics to the Prometheus text file atomically (e.g. for the node exporter textfile collector).
+        """
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as f:
+            f.write(self.to_prometheus())
+        os.replace(temporary_path, path)
+
+
+
+    def reset(self) -> None:
+        with self._lock:
+            self.histograms.clear()
+            self.gauges.clear()
+
+
+
+METRICS = Metrics() # process-wide metrics of the live pipeline
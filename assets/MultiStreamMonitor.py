@@ -0,0 +1,83 @@
+import numpy as np
+import threading
+from typing import Callable, Dict, List
+
+from assets.SignalHandler import SignalHandler
+from assets.SampleClock import SampleClock
+from assets.transformation_functions import SignalTransformer
+from assets.settings import *
+from models.InferenceScheduler import InferenceScheduler
+
+
+
+class MultiStreamMonitor:
+    """
+    Headless monitoring of many ECG streams (one SignalHandler per patient/record) on one node.
+    Every stream runs in its own thread, while all of them submit their beat windows
+    to one shared InferenceScheduler, which scores them in micro-batches with a single loaded model.
+
+    Parameters
+    ----------
+    scheduler : InferenceScheduler
+        The shared inference scheduler.
+    speed : float
+        The playback speed relative to real time, 0 for as fast as possible.
+    fs : float
+        The sampling frequency of the streams not giving their own (as a ChannelView of a record does).
+    on_beats : Callable[[str, np.ndarray, np.ndarray, np.ndarray], None]
+        Called with the stream name, peak indices, errors and flags of every scored batch of beats.
+    """
+
+    def __init__(self, scheduler: InferenceScheduler, speed: float = 1.0, fs: float = SAMPLING_RATE,
+                 on_beats: Callable[[str, np.ndarray, np.ndarray, np.ndarray], None] = None):
+        self.scheduler = scheduler
+        self.speed = speed
+        self.fs = fs
+        self.on_beats = on_beats
+
+        self.handlers: Dict[str, SignalHandler] = {}
+        self.stream_fs: Dict[str, float] = {} # sampling frequency every stream is played at
+        self._threads: List[threading.Thread] = []
+
+
+
+    def add_stream(self, name: str, signal: np.ndarray, streaming: bool = False, fs: float = None) -> SignalHandler:
+        """
+        Creates the signal handler of a new stream, scoring through the shared scheduler.
+        The stream is played at the given sampling frequency, else at the one of the signal, else at the default one.
+        Nothing is drawn for the streams, only their beats are found and scored.
+        """
+        callback = (lambda peaks, errors, flags: self.on_beats(name, peaks, errors, flags)) if self.on_beats is not None else None
+        handler = SignalHandler(signal, SignalTransformer(), threading.Lock(), model=self.scheduler,
+                                streaming=streaming, results_callback=callback, render=False)
+        self.handlers[name] = handler
+        self.stream_fs[name] = fs if fs is not None else getattr(signal, "fs", self.fs)
+        return handler
+
+
+
+    def run(self) -> None:
+        """
+        Plays all the streams concurrently until all of them are finished.
+        """
+        self.scheduler.start()
+        self._threads = [threading.Thread(target=self._play, args=(handler, self.stream_fs[name]), name=f"stream-{name}", daemon=True)
+                         for name, handler in self.handlers.items()]
+        for thread in self._threads:
+            thread.start()
+        for thread in self._threads:
+            thread.join()
+        self.scheduler.stop()
+
+
+
+    def _play(self, handler: SignalHandler, fs: float) -> None:
+        step = FRAME_SIZE // 2 # samples advanced at once, one analysis window
+        clock = SampleClock(fs, self.speed)
+        idx = 1
+        if self.speed > 0: # keeping the stream in real time (times the speed)
+            clock.start(idx)
+        while handler.run_signal:
+            handler.update_signal_range(idx, idx + step)
+            idx += step
+            clock.wait_until(idx)
@@ -0,0 +1,104 @@
+import cProfile
+import functools
+import time
+from typing import Dict, List
+
+from assets.SignalHandler import SignalHandler
+from assets.settings import *
+
+
+
+class ReplayProfiler:
+    """
+    Headless replay of a record through SignalHandler.update_signal_frame as fast as possible (no Qt timer nor widgets),
+    timing every stage of the pipeline. The stages are timed by wrapping the methods of the given handler (and its transformer),
+    the handler itself is not modified otherwise.
+
+    Parameters
+    ----------
+    handler : SignalHandler
+        The handler of the record to replay.
+    """
+
+    STAGES = { # stage name: (handler attribute holding the method, or None for the handler itself, method name)
+        "signal drawing": (None, "_draw_next_signal_frame"),
+        "analysis area drawing": (None, "_draw_peak_search_area"),
+        "denoising": (None, "_feed_denoiser"),
+        "peak search transform": ("transformer", "transform_signal"),
+        "peak search": (None, "_get_n_highest_peaks"),
+        "streaming peak search": (None, "_get_streaming_peaks"),
+        "found peaks drawing": (None, "_draw_found_peaks"),
+        "beat windows": (None, "_collect_prediction_windows"),
+        "inference": (None, "predict_anomaly"),
+        "sub view drawing": (None, "_update_sub_frame"),
+        "annotations drawing": (None, "_draw_annotations"),
+    }
+
+    def __init__(self, handler: SignalHandler):
+        self.handler = handler
+        self.calls = {stage: 0 for stage in self.STAGES}
+        self.times = {stage: 0.0 for stage in self.STAGES}
+        self.wall_time = 0.0
+        self.n_samples = 0
+
+        for stage, (owner, name) in self.STAGES.items():
+            target = handler if owner is None else getattr(handler, owner)
+            setattr(target, name, self._timed(stage, getattr(target, name)))
+
+
+
+    def run(self, stop_idx: int = None, cprofile_path: str = None) -> None:
+        """
+        Replays the record from the start up to stop_idx (the whole record by default),
+        optionally under cProfile, dumping the pstats to the given file.
+        """
+        stop_idx = len(self.handler.signal) if stop_idx is None else min(stop_idx, len(self.handler.signal))
+        profiler = cProfile.Profile() if cprofile_path is not None else None
+
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        self.handler.update_signal_range(1, stop_idx)
+        self.wall_time = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+
+        self.n_samples = stop_idx - 1
+
+
+
+    def report(self) -> str:
+        """
+        Formats the wall time, calls and share of every stage, and the replay throughput.
+        """
+        lines = [f"{'stage':24s} {'calls':>8s} {'total s':>9s} {'mean ms':>9s} {'share':>7s}"]
+        stages: List[str] = [stage for stage in self.STAGES if self.calls[stage] > 0]
+        for stage in stages:
+            lines.append(f"{stage:24s} {self.calls[stage]:8d} {self.times[stage]:9.3f} {self.times[stage] / self.calls[stage] * 1e3:9.4f} "
+                         f"{self.times[stage] / self.wall_time:7.1%}")
+
+        other = self.wall_time - sum(self.times[stage] for stage in stages) # the stages are not nested in each other
+        lines.append(f"{'other':24s} {'':8s} {other:9.3f} {'':9s} {other / self.wall_time:7.1%}")
+        lines.append("")
+        lines.append(f"{self.n_samples} samples, {len(self.handler.beat_errors)} beats in {self.wall_time:.2f} s - "
+                     f"{self.n_samples / self.wall_time:.0f} samples/s, {self.n_samples / self.wall_time / SAMPLING_RATE:.1f}x real time")
+        return "\n".join(lines)
+
+
+
+    def results(self) -> Dict[str, Dict[str, float]]:
+        return {stage: {"calls": self.calls[stage], "total_s": self.times[stage]} for stage in self.STAGES}
+
+
+
+    def _timed(self, stage: str, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.times[stage] += time.perf_counter() - start
+                self.calls[stage] += 1
+        return timed
@@ -0,0 +1,359 @@
+import numpy as np
+import hashlib
+import json
+import os
+import threading
+import wfdb
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError: # not on Windows, where the store has a single writer
+    fcntl = None
+
+
+
+class ResultStore:
+    """
+    Append-only columnar on-disk store of the per-beat results of one record.
+    Every column (sample index, reconstruction error, anomaly flag, version) is a raw binary file appended as the analysis runs,
+    the versions (model and transformer identifiers) are listed in meta.json and referenced by their position.
+    The results are indexed by the sample position, so the beats of any signal range are found with a binary search.
+    The identity of the record (see record_key) is kept in meta.json, and a store is not opened for another record.
+    The processes sharing a store (e.g. the GUI and score.py) append whole rows and assign the version ids under a lock file.
+
+    Parameters
+    ----------
+    directory : str
+        The directory of the store, created if it does not exist (unless read_only).
+    record : str
+        The identity of the record the results belong to, None to not check it.
+    read_only : bool
+        Opens the store only for reading: nothing is created or truncated, and the rows another process is appending meanwhile are ignored.
+        A missing store is read as an empty one.
+    """
+
+    COLUMNS = {"sample": np.int64, "error": np.float32, "flag": np.int8, "version": np.uint16}
+
+    def __init__(self, directory: str, record: str = None, read_only: bool = False):
+        self.directory = directory
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self.versions = []
+        self.record = record
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._file_lock(): # no writer of another process is in the middle of an append meanwhile
+            meta = self._read_meta()
+            if meta is not None:
+                self.versions = meta["versions"]
+                if record is not None and meta.get("record") != record:
+                    raise ValueError(f'Result store {directory} belongs to another record ({meta.get("record")}), not to {record}.')
+                self.record = meta.get("record")
+            elif record is not None and not read_only:
+                self._write_meta()
+
+            columns = {name: self._read_column(name) for name in self.COLUMNS}
+            self._n_rows = min(len(column) for column in columns.values()) # rows cut by an interrupted (or, read-only, ongoing) append are dropped
+            self._data = {name: column[:self._n_rows].copy() for name, column in columns.items()} # growable columns, filled up to _n_rows
+            if not read_only:
+                for name in self.COLUMNS:
+                    with open(self._column_path(name), "ab") as f:
+                        f.truncate(self._column(name).nbytes)
+
+        self._files = {} if read_only else {name: open(self._column_path(name), "ab") for name in self.COLUMNS}
+        self._indexes = {} # rows of every version id sorted by the sample index
+        rows = np.arange(self._n_rows)
+        for version_id in np.unique(self._column("version")):
+            version_rows = rows[self._column("version") == version_id]
+            self._indexes[int(version_id)] = SortedRows(version_rows, self._column("sample")[version_rows])
+
+
+
+    @classmethod
+    def for_record(cls, record_path: str, root: str, read_only: bool = False) -> "ResultStore":
+        """
+        Opens the store of the given record (.hea without the extension) in the root directory.
+        The store is named after the record and its identity, so the records of the same name (e.g. from different databases) get their own stores.
+        """
+        record = record_key(record_path)
+        return cls(os.path.join(root, f"{os.path.basename(record_path)}-{record[:12]}"), record, read_only)
+
+
+
+    def __len__(self) -> int:
+        return self._n_rows
+
+
+
+    def append(self, samples: np.ndarray, errors: np.ndarray, flags: np.ndarray, version: str) -> None:
+        """
+        Appends the results of the given beats, written to disk right away.
+        The columns grow geometrically, so appending during the playback of a long record costs only the new rows.
+        """
+        if self.read_only:
+            raise ValueError(f"Result store {self.directory} is opened read-only.")
+        if len(samples) == 0:
+            return
+        with self._lock, self._file_lock():
+            version_id = self._version_id(version)
+            rows = {"sample": samples, "error": errors, "flag": flags, "version": np.full((len(samples),), version_id)}
+            first, last = self._n_rows, self._n_rows + len(samples)
+            for name, dtype in self.COLUMNS.items():
+                column = np.asarray(rows[name], dtype=dtype)
+                self._files[name].write(column.tobytes())
+                self._files[name].flush()
+                if last > len(self._data[name]):
+                    grown = np.empty((max(last, 2 * len(self._data[name]), 1024),), dtype=dtype)
+                    grown[:first] = self._data[name][:first]
+                    self._data[name] = grown
+                self._data[name][first:last] = column
+            self._n_rows = last
+            self._indexes.setdefault(version_id, SortedRows()).add(np.arange(first, last), self._column("sample")[first:last])
+
+
+
+    def lookup(self, samples: np.ndarray, version: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Finds the stored results of the given beats for the given version.
+
+        Returns
+        -------
+        (found, errors, flags) : Tuple[np.ndarray, np.ndarray, np.ndarray]
+            Mask of the beats found in the store and their errors and flags (valid only where found).
+        """
+        samples = np.asarray(samples, dtype=np.int64)
+        errors = np.zeros((len(samples),), dtype=self.COLUMNS["error"])
+        flags = np.zeros((len(samples),), dtype=self.COLUMNS["flag"])
+
+        with self._lock:
+            index = self._indexes.get(self.versions.index(version)) if version in self.versions else None
+            if index is None:
+                return np.zeros((len(samples),), dtype=bool), errors, flags
+            rows = index.find(samples)
+            found = rows >= 0
+            errors[found] = self._column("error")[rows[found]]
+            flags[found] = self._column("flag")[rows[found]]
+        return found, errors, flags
+
+
+
+    def read(self, start: int = 0, stop: int = None, version: str = None) -> Dict[str, np.ndarray]:
+        """
+        Returns the results of the beats in the sample range [start, stop), sorted by the sample index,
+        of all the versions or only of the given one.
+        """
+        with self._lock:
+            version_ids = self._indexes.keys() if version is None else [self.versions.index(version)] if version in self.versions else []
+            ranges = [self._indexes[version_id].range(start, stop) for version_id in version_ids if version_id in self._indexes]
+            rows = np.concatenate([rows for rows, _ in ranges]) if ranges else np.empty((0,), dtype=np.int64)
+            if len(ranges) > 1: # merging the versions, in the order of the appends within the same sample
+                rows = rows[np.lexsort((rows, np.concatenate([samples for _, samples in ranges])))]
+            return {name: self._column(name)[rows] for name in self.COLUMNS}
+
+
+
+    def close(self) -> None:
+        for f in self._files.values():
+            f.close()
+
+
+
+    def _column(self, name: str) -> np.ndarray:
+        return self._data[name][:self._n_rows]
+
+
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+
+
+    def _read_column(self, name: str) -> np.ndarray:
+        """
+        The whole rows of the column file, a trailing partial row is ignored.
+        """
+        dtype = np.dtype(self.COLUMNS[name])
+        path = self._column_path(name)
+        if not os.path.exists(path):
+            return np.empty((0,), dtype=dtype)
+        return np.fromfile(path, dtype=dtype, count=os.path.getsize(path) // dtype.itemsize)
+
+
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Holds the lock file of the store, shared by all the processes writing to it (no lock for the read-only stores).
+        """
+        if self.read_only or fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+
+    def _version_id(self, version: str) -> int:
+        """
+        The id of the version, assigned under the lock file after reloading the versions other processes may have added meanwhile.
+        """
+        if version not in self.versions:
+            meta = self._read_meta()
+            if meta is not None:
+                self.versions = meta["versions"] # only ever appended to, so the known ids stay valid
+            if version not in self.versions:
+                self.versions.append(version)
+                self._write_meta()
+        return self.versions.index(version)
+
+
+
+    def _read_meta(self) -> Optional[dict]:
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            return json.load(f)
+
+
+
+    def _write_meta(self) -> None:
+        """
+        Replaces meta.json atomically, so a reader never sees it half written.
+        """
+        meta_path = os.path.join(self.directory, "meta.json")
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"record": self.record, "columns": {name: np.dtype(dtype).str for name, dtype in self.COLUMNS.items()}, "versions": self.versions}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+
+
+class SortedRows:
+    """
+    Rows of one version of a ResultStore, sorted by their sample index, growing with the appends.
+    The rows coming in order after the sorted ones (the usual case during playback) are appended to the sorted run in amortized constant time,
+    the others (e.g. after a seek back) go to a small sorted tail, merged into the run once it outgrows merge_size (or 1/64 of the run),
+    so no append sorts or copies the whole index.
+
+    Parameters
+    ----------
+    rows : np.ndarray
+        The initial rows.
+    samples : np.ndarray
+        The sample indices of the initial rows.
+    merge_size : int
+        The minimal size of the tail merged into the sorted run.
+    """
+
+    def __init__(self, rows: np.ndarray = None, samples: np.ndarray = None, merge_size: int = 4096):
+        rows = np.empty((0,), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        samples = np.empty((0,), dtype=np.int64) if samples is None else np.asarray(samples, dtype=np.int64)
+        order = np.argsort(samples, kind="stable")
+        self._rows, self._samples = rows[order], samples[order] # sorted run, filled up to _n
+        self._n = len(rows)
+        self._tail_rows, self._tail_samples = np.empty((0,), dtype=np.int64), np.empty((0,), dtype=np.int64)
+        self.merge_size = merge_size
+
+
+
+    def __len__(self) -> int:
+        return self._n + len(self._tail_rows)
+
+
+
+    def add(self, rows: np.ndarray, samples: np.ndarray) -> None:
+        order = np.argsort(samples, kind="stable")
+        rows, samples = np.asarray(rows, dtype=np.int64)[order], np.asarray(samples, dtype=np.int64)[order]
+        if self._n == 0 or samples[0] >= self._samples[self._n - 1]:
+            if self._n + len(rows) > len(self._rows):
+                capacity = max(self._n + len(rows), 2 * len(self._rows), 1024)
+                self._rows, self._samples = self._grown(self._rows, capacity), self._grown(self._samples, capacity)
+            self._rows[self._n:self._n + len(rows)] = rows
+            self._samples[self._n:self._n + len(rows)] = samples
+            self._n += len(rows)
+            return
+
+        positions = np.searchsorted(self._tail_samples, samples, side="right")
+        self._tail_rows = np.insert(self._tail_rows, positions, rows)
+        self._tail_samples = np.insert(self._tail_samples, positions, samples)
+        if len(self._tail_rows) > max(self.merge_size, self._n // 64):
+            self._merge()
+
+
+
+    def find(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Rows of the given sample indices, -1 for the samples not found.
+        """
+        rows = np.full((len(samples),), -1, dtype=np.int64)
+        for sorted_rows, sorted_samples in ((self._tail_rows, self._tail_samples), (self._rows[:self._n], self._samples[:self._n])):
+            if len(sorted_rows) > 0:
+                positions = np.minimum(np.searchsorted(sorted_samples, samples), len(sorted_rows) - 1)
+                found = sorted_samples[positions] == samples
+                rows[found] = sorted_rows[positions[found]]
+        return rows
+
+
+
+    def range(self, start: int, stop: int = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rows and sample indices of the samples in [start, stop), sorted by the sample index.
+        """
+        parts = []
+        for sorted_rows, sorted_samples in ((self._rows[:self._n], self._samples[:self._n]), (self._tail_rows, self._tail_samples)):
+            first = np.searchsorted(sorted_samples, start)
+            last = np.searchsorted(sorted_samples, stop) if stop is not None else len(sorted_samples)
+            parts.append((sorted_rows[first:last], sorted_samples[first:last]))
+        rows, samples = np.concatenate([rows for rows, _ in parts]), np.concatenate([samples for _, samples in parts])
+        if len(parts[1][0]) > 0:
+            order = np.lexsort((rows, samples))
+            rows, samples = rows[order], samples[order]
+        return rows, samples
+
+
+
+    def _merge(self) -> None:
+        positions = np.searchsorted(self._samples[:self._n], self._tail_samples, side="right")
+        self._rows = np.insert(self._rows[:self._n], positions, self._tail_rows)
+        self._samples = np.insert(self._samples[:self._n], positions, self._tail_samples)
+        self._n = len(self._rows)
+        self._tail_rows, self._tail_samples = np.empty((0,), dtype=np.int64), np.empty((0,), dtype=np.int64)
+
+
+
+    @staticmethod
+    def _grown(array: np.ndarray, capacity: int) -> np.ndarray:
+        grown = np.empty((capacity,), dtype=array.dtype)
+        grown[:len(array)] = array
+        return grown
+
+
+
+def record_key(record_path: str) -> str:
+    """
+    Identity of the record (.hea without the extension) - digest of its header and of the size and modification time of its signal files.
+    """
+    digest = hashlib.sha1()
+    with open(record_path + ".hea", "rb") as f:
+        digest.update(f.read())
+    header = wfdb.rdheader(record_path)
+    directory = os.path.dirname(record_path)
+    for file_name in sorted(set(getattr(header, "file_name", None) or [])):
+        stat = os.stat(os.path.join(directory, file_name))
+        digest.update(f"{file_name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+
+def result_version(model_id: str, transformer_id: str, preprocessing: str) -> str:
+    """
+    Version of the results - identifies the model, the transformer parameters and the beat window preprocessing ("windowed" or "streaming").
+    """
+    return f"{model_id}/{transformer_id}/{preprocessing}"
@@ -0,0 +1,87 @@
+import time
+
+
+
+class SampleClock:
+    """
+    Monotonic clock of the playback in samples, locked to the sampling frequency of the record.
+    Anchored at a sample index and a perf_counter time, every later sample is due at anchor + (idx - anchor_idx) / (fs * speed),
+    so the pacing never accumulates the error of the timer (or the sleep) that drives it.
+
+    Parameters
+    ----------
+    fs : float
+        The sampling frequency of the record.
+    speed : float
+        The playback speed relative to real time.
+    """
+
+    def __init__(self, fs: float, speed: float = 1.0):
+        self.fs = fs
+        self.speed = speed
+        self.running = False
+        self._anchor_time = 0.0 # perf_counter time the anchor sample is due at
+        self._anchor_idx = 0 # sample index the clock is anchored at
+
+
+
+    def start(self, idx: int) -> None:
+        """
+        (Re)starts the clock from the given sample, due now.
+        """
+        self._anchor_time = time.perf_counter()
+        self._anchor_idx = idx
+        self.running = True
+
+
+
+    def stop(self) -> None:
+        self.running = False
+
+
+
+    def set_speed(self, speed: float) -> None:
+        """
+        Changes the playback speed from the sample due now on.
+        """
+        idx = self.now()
+        self.speed = speed
+        if self.running:
+            self.start(idx)
+
+
+
+    def now(self) -> int:
+        """
+        The sample index due at the current time (the anchor sample if the clock is stopped).
+        """
+        if not self.running:
+            return self._anchor_idx
+        return self._anchor_idx + int((time.perf_counter() - self._anchor_time) * self.fs * self.speed)
+
+
+
+    def time_of(self, idx: int) -> float:
+        """
+        The perf_counter time the sample is due at.
+        """
+        return self._anchor_time + (idx - self._anchor_idx) / (self.fs * self.speed)
+
+
+
+    def lag(self, idx: int) -> float:
+        """
+        Seconds (of the record) the given (last processed) sample is behind the clock, negative if ahead.
+        """
+        return (self.now() - idx) / self.fs
+
+
+
+    def wait_until(self, idx: int) -> None:
+        """
+        Sleeps until the sample is due, returns at once if it already is (or if the clock is stopped).
+        """
+        if self.running:
+            delay = self.time_of(idx) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
@@ -0,0 +1,119 @@
+import numpy as np
+import cv2
+from typing import Tuple
+
+
+
+class ScrollingFrame:
+    """
+    Ring-buffer backed image scrolling to the left, used for the main signal view.
+    Instead of shifting the whole image for every new sample, the columns are written at a moving offset.
+    The buffer is twice as wide as the view and every column is kept in both halves,
+    so the visible image is always one contiguous slice of the buffer.
+    All the drawing methods take coordinates of the visible image.
+
+    Parameters
+    ----------
+    height : int
+        The height of the view.
+    width : int
+        The width of the view.
+    """
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+
+        self._buffer = np.zeros((height, 2 * width, 3), dtype=np.uint8)
+        self._offset = 0 # buffer column of the leftmost visible column
+        self.scrolled = 0 # number of columns scrolled so far, x + scrolled is the position of a view column in the whole scroll
+
+
+
+    def advance(self, n: int = 1) -> None:
+        """
+        Scrolls the view by n columns to the left, the new columns on the right are black.
+        """
+        self.scrolled += n
+        n = min(n, self.width)
+        self._offset = (self._offset + n) % self.width
+        self._set_columns(self.width - n, self.width, 0)
+
+
+
+    def clear(self, scrolled: int = 0) -> None:
+        """
+        Blanks the whole view, restarting the scroll at the given position.
+        """
+        self._buffer[:] = 0
+        self._offset = 0
+        self.scrolled = scrolled
+
+
+
+    def view(self) -> np.ndarray:
+        """
+        Returns the visible image without copying (a slice of the buffer).
+        """
+        return self._buffer[:, self._offset:self._offset + self.width]
+
+
+
+    def compose(self) -> np.ndarray:
+        """
+        Returns a contiguous copy of the visible image, to be done only when the frame is displayed.
+        """
+        return np.ascontiguousarray(self.view())
+
+
+
+    def vertical_line(self, x: int, y1: int, y2: int, color: Tuple[int, int, int]) -> None:
+        """
+        Draws a one pixel wide vertical line in the given column.
+        """
+        y_lo, y_hi = max(min(y1, y2), 0), min(max(y1, y2), self.height - 1)
+        for column in self._mirrored_columns(x):
+            self._buffer[y_lo:y_hi + 1, column] = color
+
+
+
+    def line(self, p1: Tuple[int, int], p2: Tuple[int, int], color: Tuple[int, int, int], thickness: int = 1) -> None:
+        cv2.line(self.view(), p1, p2, color, thickness)
+        self._sync_mirror(min(p1[0], p2[0]) - thickness, max(p1[0], p2[0]) + thickness + 1)
+
+
+
+    def circle(self, center: Tuple[int, int], radius: int, color: Tuple[int, int, int], thickness: int = 1) -> None:
+        cv2.circle(self.view(), center, radius=radius, color=color, thickness=thickness)
+        self._sync_mirror(center[0] - radius - thickness, center[0] + radius + thickness + 1)
+
+
+
+    def rectangle(self, p1: Tuple[int, int], p2: Tuple[int, int], color: Tuple[int, int, int], thickness: int = 1) -> None:
+        cv2.rectangle(self.view(), p1, p2, color, thickness)
+        self._sync_mirror(min(p1[0], p2[0]) - thickness, max(p1[0], p2[0]) + thickness + 1)
+
+
+
+    def _mirrored_columns(self, x: int) -> Tuple[int, int]:
+        column = self._offset + x
+        return (column, column - self.width if column >= self.width else column + self.width)
+
+
+
+    def _sync_mirror(self, x1: int, x2: int) -> None:
+        """
+        Copies the visible columns [x1, x2) (drawn on the view) to their mirrors in the other half of the buffer.
+        """
+        start, stop = self._offset + max(x1, 0), self._offset + min(x2, self.width)
+        if start < min(stop, self.width): # columns in the left half
+            self._buffer[:, start + self.width:min(stop, self.width) + self.width] = self._buffer[:, start:min(stop, self.width)]
+        if max(start, self.width) < stop: # columns in the right half
+            self._buffer[:, max(start, self.width) - self.width:stop - self.width] = self._buffer[:, max(start, self.width):stop]
+
+
+
+    def _set_columns(self, x1: int, x2: int, value) -> None:
+        columns = self._offset + np.arange(x1, x2)
+        mirrors = np.where(columns >= self.width, columns - self.width, columns + self.width)
+        self._buffer[:, np.concatenate([columns, mirrors])] = value
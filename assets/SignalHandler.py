@@ -1,112 +1,243 @@
 import numpy as np
 import cv2
 from scipy.signal import find_peaks
-from datetime import datetime
 import threading
-from typing import Tuple, List
+import time
+from typing import Tuple, List, Callable
 
 from assets.transformation_functions import SignalTransformer
+from assets.StreamingDenoiser import StreamingDenoiser
+from assets.StreamingPeakDetector import StreamingPeakDetector
 from assets.UserSettings import UserSettings
 from assets.settings import *
-from assets.utils import map_to_rgb
+from assets.utils import map_to_rgb, map_to_rgb_array, signal_extrema
+from assets.drawing_functions import draw_signal, fill_between
+from assets.ScrollingFrame import ScrollingFrame
+from assets.FrameBuffers import FrameBuffers
+from assets.ResultStore import ResultStore, result_version
+from assets.WindowCache import WindowCache
+from assets.Metrics import Metrics, METRICS
 from models.AnomalyDetector import AnomalyDetector
+from models.ModelLoader import ModelLoader
 
-MODEL_DEFAULT = AnomalyDetector("models/final_model.keras")
+MODEL_LOADER = ModelLoader(MODEL_PATH, MODEL_BACKEND, FRAME_SIZE, MODEL_SERVER_ADDRESS, MODEL_SERVER_AUTHKEY_FILE, SIGNAL_DTYPE) # default model, loaded in the background on demand
+WINDOW_CACHE = WindowCache(WINDOW_CACHE_BYTES) # shared by the handlers of all the opened records
 
 
 
 
 class SignalHandler:
 
-    def __init__(self, signal: np.ndarray, transformer: SignalTransformer, lock: threading.Lock, model: AnomalyDetector = MODEL_DEFAULT):
+    def __init__(self, signal: np.ndarray, transformer: SignalTransformer, lock: threading.Lock, model: AnomalyDetector = None, streaming: bool = False,
+                 results_callback: Callable[[np.ndarray, np.ndarray, np.ndarray], None] = None, result_store: ResultStore = None,
+                 record_id: str = None, window_cache: WindowCache = None, metrics: Metrics = METRICS, display: bool = False,
+                 leads: List[np.ndarray] = None, streaming_peaks: bool = False, render: bool = True):
         self.user_settings = UserSettings()
-        self.signal = signal # original full loaded signal
+        self.signal = signal # original full signal, array or lazily read ChannelView
+        self.leads = leads if leads is not None else [signal] # all the leads of the record scored together, the first one is the viewed signal
         self.transformer = transformer # function to transform signal
-        self.model = model # model for anomaly detection
+        self._model = model # model for anomaly detection, the default one is taken from MODEL_LOADER when first needed
         self.lock = lock # lock for threading
+        self.results_callback = results_callback # called with the peak indices, errors and flags (per lead for many leads) of every scored batch of beats
+        self.result_store = result_store # persistent per-beat results of the record, the beats found there are not scored again
+        self.record_id = record_id # identifies the record in the window cache
+        self.window_cache = window_cache if record_id is not None else None # computations of the already seen beats
+        self.metrics = metrics # latency histograms of the stages
+        self.render = render # drawing the views, off for the headless streams - only the beats are found and scored
 
         self.run_signal = True # flag for stopping the signal view
+        self.position = 0 # index of the last drawn sample (the playhead), in the right-most column of frame_main
 
-        self.frame_main = np.ones((HEIGHT, WIDTH, 3), dtype=np.uint8) * 0 # frame for main signal view
-        self.signal_view = self.transformer._normalize_signal(self.signal) # signal to be viewed on main frame
-        self.sub_signal_frame = None # frame for sub signal view
+        self.frame_main = ScrollingFrame(HEIGHT, WIDTH) if render else None # ring-buffered frame for main signal view
+        self.view_min, self.view_max = signal_extrema(self.signal) if render else (0.0, 1.0) # range of the signal viewed on main frame, normalized per drawn sample
+        self.sub_signal_frame = None # frame for sub signal view (without the display buffers)
+        # display mode - the frames are rendered at the sizes of the views into buffers handed off to the GUI
+        self.main_buffers = FrameBuffers(MAIN_WINDOW_SHAPE[1], MAIN_WINDOW_SHAPE[0]) if display else None
+        self.sub_buffers = FrameBuffers(SUB_WINDOW_SHAPE[1], SUB_WINDOW_SHAPE[0]) if display else None
+        self._sub_frame_beat = None # (window, reconstruction, error) of the beat shown in the sub view
+
+        # every scored beat - sample index and reconstruction error, kept so the beats can be re-colored for a new threshold without scoring them again;
+        # the error of a multi-lead beat is the highest of its leads, whose errors are kept too
+        self.beat_samples, self.beat_errors, self.beat_lead_errors = [], [], []
+        self._scored_beats = set() # sample indices in beat_samples, the beats scored again after a seek back are kept once
 
         self.window_length = FRAME_SIZE // 2 # length of window to be analyzed in terms of peaks
         self.ii = 0 # index for window analysis
 
-        self.__warm_up_model()
+        # streaming mode - every sample is denoised once, the beats are found incrementally in the cleaned signal
+        self.denoiser = self._new_denoiser() if streaming else None
+        self.lead_denoisers = [self.denoiser] + [self._new_denoiser() for _ in self.leads[1:]] if streaming else None
+        # streaming peaks - the beats are found incrementally (across the analysis windows) also for the windowed beat preprocessing,
+        # in the signal cleaned by a denoiser of their own
+        self.peak_denoiser = self.denoiser if streaming else self._new_denoiser() if streaming_peaks else None
+        self.peak_detector = StreamingPeakDetector(distance=int(0.2 * self.transformer.fs)) if self.peak_denoiser is not None else None
+        self.detected_until = 0 # index of the signal up to which the samples went to the peak detector
+
+
+
+    @property
+    def model(self) -> AnomalyDetector:
+        if self._model is None:
+            self._model = MODEL_LOADER.get() # waits for the background loading (called from the compute thread)
+        return self._model
 
 
     
     def update_signal_frame(self, idx: int) -> np.ndarray:
-            if idx < len(self.signal_view):
+            self.update_signal_range(idx, idx + 1)
+            
+            
+
+    def update_signal_range(self, start_idx: int, stop_idx: int) -> None:
+        """
+        Advances the signal by all the frames [start_idx, stop_idx), stops at the end of the signal.
+        The frames up to every analysis point are drawn under one acquisition of the lock, the analysis runs outside of it.
+        """
+        idx = start_idx
+        while idx < stop_idx:
+            if idx >= len(self.signal):
+                self.run_signal = False # False - end of the signal
+                break
+
+            analysis_idx = max(-(-idx // self.window_length) * self.window_length, self.window_length) # next frame closing an analysis window
+            end = min(analysis_idx + 1, stop_idx, len(self.signal))
+            if self.render:
+                start = time.perf_counter()
                 with self.lock:
-                    self._draw_next_signal_frame(idx)
+                    locked = time.perf_counter()
+                    for i in range(idx, end):
+                        self._draw_next_signal_frame(i)
+                self.metrics.observe("lock_wait", locked - start) # timed by hand, once for every drawn chunk
+                self.metrics.observe("signal_drawing", time.perf_counter() - locked)
+            else:
+                self.position = end - 1
 
-                # drawing rectangles in the analysis area, finding peaks and drawing them
-                if (idx > self.window_length and idx % self.window_length == 0) or (idx == self.window_length): # 
-                    if self._get_analyze_state():
+            # drawing rectangles in the analysis area, finding peaks and drawing them
+            if end - 1 == analysis_idx:
+                if self._show_analysis():
+                    with self.metrics.acquire(self.lock), self.metrics.timer("drawing"):
                         self._draw_peak_search_area()
 
-                    self.find_signal_peaks()
-                    self.ii += 1
-            
-                self.run_signal = True # True - continue the signal
-            else:
-                self.run_signal = False # False - end of the signal
-            
-            
+                if self.peak_denoiser is not None:
+                    with self.metrics.timer("transform"):
+                        self._feed_denoiser(analysis_idx)
+                self.find_signal_peaks()
+                self.ii += 1
+
+            self.run_signal = True # True - continue the signal
+            idx = end
+
+        if self.main_buffers is not None:
+            with self.metrics.acquire(self.lock):
+                self._render_main_frame()
+
+
+
+    def seek(self, idx: int) -> None:
+        """
+        Jumps the playhead to the given sample. The main frame is rendered straight from the signal and the results known at that position -
+        the beats scored in this session and the ones in the result store - so the cost does not depend on the position.
+        The analysis continues from the analysis window of the sample on.
+        """
+        idx = min(max(idx, 1), len(self.signal) - 1)
+        if self.render:
+            first = max(idx - WIDTH // int(SCALE_X) + 1, 1) # first sample in the view
+            beat_samples, beat_errors = self._known_beats(first - 30, idx + 1) # the marker line is 50 pixels wide
+
+            with self.metrics.acquire(self.lock), self.metrics.timer("drawing"):
+                self.frame_main.clear(idx * int(SCALE_X))
+                self.position = idx
+                for sample in range(first, idx + 1):
+                    self._draw_signal_sample(sample)
+                colors = map_to_rgb_array(beat_errors, self.user_settings.anomaly_threshold)
+                for sample, c in zip(beat_samples, colors):
+                    self._draw_beat_marker(int(self._sample_x(sample)), tuple(int(v) for v in c))
+                self._render_main_frame()
+        else:
+            self.position = idx
+
+        self.ii = idx // self.window_length # the window analyzed when the next multiple of window_length is reached
+        if self.peak_denoiser is not None: # the streaming state restarts a beat window before the analysis window, for the context of its beats
+            window_start = self.ii * self.window_length
+            for denoiser in self._streamed_denoisers:
+                denoiser.reset(max(window_start - FRAME_SIZE, 0))
+            self.peak_detector.reset(window_start)
+            self.detected_until = window_start
+        self.run_signal = True
+
+
 
     def find_signal_peaks(self) -> None:
-        # transforming only the analysis window
-        signal_window = self.transformer.transform_signal(self.signal[self.ii*self.window_length:(self.ii+1)*self.window_length])
         threshold = self.user_settings.peak_finding_threshold
         max_peaks = self.user_settings.max_peaks
-        peaks = self._get_n_highest_peaks(signal_window, max_peaks, threshold, 10)
 
-        if self._get_analyze_state():
-            self._draw_found_peaks(peaks)
-
-        self.make_predictions(peaks)
+        if self.peak_detector is not None:
+            with self.metrics.timer("peak_search"):
+                peak_indices = self._get_streaming_peaks(threshold, max_peaks)
+        else:
+            # transforming only the analysis window
+            with self.metrics.timer("transform"):
+                signal_window = self.transformer.transform_signal(self.signal[self.ii*self.window_length:(self.ii+1)*self.window_length])
+            with self.metrics.timer("peak_search"):
+                peaks = self._get_n_highest_peaks(signal_window, max_peaks, threshold, 10)
+            peak_indices = self.ii * self.window_length + (self.window_length / FRAME_SIZE * peaks).astype(int) # indices of the peaks in the full signal
+
+        if self._show_analysis():
+            with self.metrics.acquire(self.lock), self.metrics.timer("drawing"):
+                self._draw_found_peaks(peak_indices)
+
+        self.make_predictions(peak_indices)
         
 
     
-    def make_predictions(self, peaks: np.ndarray) -> np.ndarray:
-        if len(peaks) > 0:
-            start_time = datetime.now()
+    def make_predictions(self, peak_indices: np.ndarray) -> None:
+        if len(peak_indices) > 0:
             peaks_results = []
 
-            for p in peaks:
-                peak_idx = self.ii * self.window_length + int(self.window_length / FRAME_SIZE * p) # index of the peak in the full signal
-
-                if peak_idx > FRAME_SIZE // 2: # the half
-                    prediction_window = self.transformer.transform_signal(np.hstack([self.signal[peak_idx-432:peak_idx], self.signal[peak_idx:peak_idx+432]]))
-                    csf = np.ones((200, FRAME_SIZE, 3), dtype=np.uint8) * 0 # frame for sub signal view
-                    prediction = self.predict_anomaly(prediction_window)
+            beat_peaks, prediction_windows, cached = self._collect_prediction_windows(peak_indices)
+
+            if len(beat_peaks) > 0:
+                # single batched forward pass for every beat of the analysis window not found in the cache or the result store
+                reconstructed_signals, errors, flags = self._score_windows(np.asarray(beat_peaks), prediction_windows, cached)
+                if self.results_callback is not None:
+                    self.results_callback(np.asarray(beat_peaks), errors, flags)
+
+                beat_errors = errors.max(axis=1) if self.multi_lead else errors # the most deviating lead colors the beat
+                if self.render:
+                    colors = map_to_rgb_array(beat_errors, self.user_settings.anomaly_threshold)
+                    for p, c in zip(beat_peaks, colors):
+                        peaks_results.append((p, tuple(int(v) for v in c)))
+
+                    window, reconstruction = prediction_windows[-1], reconstructed_signals[-1]
+                    if self.multi_lead: # the sub view shows the viewed lead
+                        window, reconstruction = window[0], reconstruction[0]
+                    self._sub_frame_beat = (window, reconstruction, beat_errors[-1])
+                    with self.metrics.timer("drawing"):
+                        self._update_sub_frame(peaks_results[-1][1])
+
+            with self.metrics.acquire(self.lock), self.metrics.timer("drawing"):
+                if self.render:
+                    self._draw_annotations(peaks_results) # placed by the sample indices, wherever the view has scrolled to meanwhile
+                if len(beat_peaks) > 0:
+                    self._keep_beats(beat_peaks, beat_errors, errors)
 
-                    color = map_to_rgb(prediction[1][0])
-                    peaks_results.append((p, color))
-
-                    self._draw_sub_frame(csf, prediction_window, prediction[0][0], color) # drawing the sub window
+    
 
-                    self.sub_signal_frame = cv2.resize(csf, SUB_WINDOW_SHAPE, interpolation=cv2.INTER_LINEAR)
-            
+    def predict_anomaly(self, signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        model = self.model # not timing the wait for the model loading
+        with self.metrics.timer("inference"):
+            return model.predict(signal, self.user_settings.anomaly_threshold)
+    
 
-            end_time = datetime.now()
-            delay = (end_time-start_time).microseconds / 1000 / 3
-            
-            with self.lock:
-                self._draw_annotations(peaks_results, delay)
 
-    
+    @property
+    def results_version(self) -> str:
+        return result_version(self.model.model_id, self.transformer.config_id, self._preprocessing)
 
-    def predict_anomaly(self, signal: np.ndarray) -> float:
-        return self.model.predict(signal, self.user_settings.anomaly_threshold)
-    
 
 
     def get_signal_frame(self) -> np.ndarray:
-        return self.frame_main
+        return self.frame_main.compose() # composed only when the frame is displayed
     
 
 
@@ -115,11 +246,59 @@ class SignalHandler:
 
 
 
+    @property
+    def multi_lead(self) -> bool:
+        return len(self.leads) > 1
+
+
+
+    @property
+    def beat_flags(self) -> np.ndarray:
+        """
+        Anomaly flags of all the scored beats for the current threshold (of any lead for many leads).
+        """
+        return (np.asarray(self.beat_errors) > self.user_settings.anomaly_threshold).astype(int)
+
+
+
+    @property
+    def lead_flags(self) -> np.ndarray:
+        """
+        Anomaly flags (n_beats, n_leads) of every lead of all the scored beats for the current threshold.
+        """
+        lead_errors = self.beat_lead_errors if self.multi_lead else self.beat_errors
+        return (np.asarray(lead_errors).reshape(len(self.beat_samples), len(self.leads)) > self.user_settings.anomaly_threshold).astype(int)
+
+
+
+    def recolor_beats(self) -> None:
+        """
+        Re-colors the markers of the beats still on the main frame and the sub view for the current threshold,
+        from the kept reconstruction errors - of the beats scored in this session and of the ones drawn from the result store after a seek -
+        without scoring the beats again.
+        """
+        threshold = self.user_settings.anomaly_threshold
+        if not self.render:
+            return
+        with self.metrics.acquire(self.lock):
+            first = self.position - WIDTH // int(SCALE_X) + 1 # first sample in the view
+            beat_samples, beat_errors = self._known_beats(first - 30, self.position + 30) # the marker line is 50 pixels wide
+            colors = map_to_rgb_array(beat_errors, threshold)
+            for x_mid, c in zip(self._sample_x(beat_samples), colors):
+                self._draw_beat_marker(int(x_mid), tuple(int(v) for v in c))
+            self._render_main_frame()
+
+        if self._sub_frame_beat is not None:
+            self._update_sub_frame(map_to_rgb(self._sub_frame_beat[2], threshold))
+
+
+
     def set_model_threshold(self, threshold: float) -> None:
         try:
             self.user_settings.set_anomaly_threshold(threshold)
         except ValueError:
-            pass
+            return
+        self.recolor_beats()
 
     
     def set_peak_finding_threshold(self, threshold: float) -> None:
@@ -156,35 +335,42 @@ class SignalHandler:
 
 
     def _draw_next_signal_frame(self, idx: int) -> None:
-        self.frame_main[:, :-int(SCALE_X)] = self.frame_main[:, int(SCALE_X):]  # sliding window
-        self.frame_main[:, -int(SCALE_X):] = 0 # filling new space with black
+        self.frame_main.advance(int(SCALE_X)) # sliding window, new space is black
+        self.position = idx
+        self._draw_signal_sample(idx)
+
+
 
-        y1 = int(SCALE_Y - self.signal_view[idx-1] * SCALE_Y) # drawing the signal
-        y2 = int(SCALE_Y - self.signal_view[idx] * SCALE_Y)
-        cv2.line(self.frame_main, (WIDTH - 1, y1), (WIDTH - 1, y2), (11, 212, 11), 1)
+    def _draw_signal_sample(self, idx: int) -> None:
+        y1 = int(SCALE_Y - self._view_sample(idx-1) * SCALE_Y) # drawing the signal from the previous sample
+        y2 = int(SCALE_Y - self._view_sample(idx) * SCALE_Y)
+        self.frame_main.vertical_line(int(self._sample_x(idx)), y1, y2, (11, 212, 11))
 
     
 
+    def _view_sample(self, idx: int) -> float:
+        return (self.signal[idx] - self.view_min) / (self.view_max - self.view_min)
+
+
+
     def _draw_peak_search_area(self, h_bound: Tuple[int, int] = (50, 350)) -> None:
         x1_r = WIDTH - self.window_length
         x2_r = WIDTH - 1
         color = self.user_settings.analyze_mode_color
 
-        cv2.rectangle(self.frame_main, (x1_r, h_bound[0]), (x2_r, h_bound[1]), color, 1)
+        self.frame_main.rectangle((x1_r, h_bound[0]), (x2_r, h_bound[1]), color, 1)
 
     
 
-    def _draw_found_peaks(self, peaks: np.ndarray) -> None:
+    def _draw_found_peaks(self, peak_indices: np.ndarray) -> None:
         color = self.user_settings.analyze_mode_color
-        for p in peaks:
-            cv2.circle(self.frame_main, (WIDTH - self.window_length + int(self.window_length / 864 * p), 100), radius=2, color=color, thickness=3)
+        for x in self._sample_x(np.asarray(peak_indices, dtype=np.int64)):
+            self.frame_main.circle((int(x), 100), radius=2, color=color, thickness=3)
 
     
 
     def _draw_sub_frame(self, pixmap: np.ndarray, signal_window: np.ndarray, predicted_signal: np.ndarray, color: Tuple[int, int, int] = (0, 0, 255)) -> None:
-        h, w = pixmap.shape[:2]
-        for i in range(1, w): # drawing the sub window
-            cv2.line(pixmap, (i-1, int(h - h*signal_window[i-1])), (i, int(h - h*signal_window[i])), color, 2)
+        draw_signal(pixmap, signal_window, color) # drawing the sub window
 
         if self._get_analyze_state():
             self._draw_sub_frame_analysis(pixmap, signal_window, predicted_signal, color)
@@ -192,41 +378,276 @@ class SignalHandler:
 
     
     def _draw_sub_frame_analysis(self, pixmap: np.ndarray, signal_window: np.ndarray, predicted_signal: np.ndarray, color: Tuple[int, int, int] = (255, 255, 255)) -> None: 
-        h, w = pixmap.shape[:2]
-        for i in range(1, w): # drawing the prediction
-            cv2.line(pixmap, (i-1, int(200 - 200*predicted_signal[i-1])), (i, int(h - h*predicted_signal[i])), color, 2)
-            if self.user_settings.sub_frame_fill_percentage == 0:
-                modulo_val = w
-            elif self.user_settings.sub_frame_fill_percentage == 100:
-                modulo_val = 1
-            else:
-                modulo_val = 2
-            if i % modulo_val == 0:
-                cv2.line(pixmap, (i, int(200 - 200*predicted_signal[i-1])), (i, int(h - h*signal_window[i])), color, 1)
+        if self.user_settings.sub_frame_fill_percentage == 100:
+            fill_between(pixmap, predicted_signal, signal_window, color, column_step=1)
+        elif self.user_settings.sub_frame_fill_percentage > 0:
+            fill_between(pixmap, predicted_signal, signal_window, color, column_step=2)
+
+        draw_signal(pixmap, predicted_signal, color) # drawing the prediction
 
     
 
-    def _draw_annotations(self, peaks_map: List[Tuple[int, Tuple[int, int, int]]], delay: float) -> None:
-        for p, c in peaks_map: # drawing every peak, taking into account the relative window position on the main frame
-            x_mid = (WIDTH-self.window_length-int(delay)) + int(self.window_length / 864 * p)
-            cv2.circle(self.frame_main, (x_mid, 100), radius=4, color=c, thickness=3)
-            cv2.line(self.frame_main, (x_mid-25, 10), (x_mid+25, 10), c, 2)
+    def _update_sub_frame(self, color: Tuple[int, int, int]) -> None:
+        signal_window, predicted_signal, _ = self._sub_frame_beat
+        if self.sub_buffers is not None:
+            with self.sub_buffers.render() as csf: # drawn in place in the display buffer
+                csf[:] = 0
+                self._draw_sub_frame(csf, signal_window, predicted_signal, color)
+            return
+
+        csf = np.zeros((SUB_WINDOW_SHAPE[1], SUB_WINDOW_SHAPE[0], 3), dtype=np.uint8) # frame for sub signal view, drawn directly at the target size
+        self._draw_sub_frame(csf, signal_window, predicted_signal, color) # drawing the sub window
+
+        self.sub_signal_frame = csf
+
+
+
+    def _render_main_frame(self) -> None:
+        """
+        Renders the main frame into the display buffer at the size of the main view, in one pass straight from the scrolling frame.
+        To be called under the lock.
+        """
+        if self.main_buffers is not None:
+            with self.main_buffers.render() as frame:
+                cv2.resize(self.frame_main.view(), (frame.shape[1], frame.shape[0]), dst=frame, interpolation=cv2.INTER_LINEAR)
+
+
+
+    def _draw_annotations(self, peaks_map: List[Tuple[int, Tuple[int, int, int]]]) -> None:
+        """
+        Draws the markers of the scored beats at the columns of their samples.
+        """
+        for peak_idx, c in peaks_map:
+            self._draw_beat_marker(int(self._sample_x(peak_idx)), c)
+
+
+
+    def _sample_x(self, idx):
+        """
+        Column of the main frame the sample (or the array of samples) is drawn in, from its index relative to the playhead.
+        Negative for the samples already scrolled out of the view. To be called under the lock.
+        """
+        return WIDTH - 1 - (self.position - idx) * int(SCALE_X)
+
+
+
+    def _draw_beat_marker(self, x_mid: int, color: Tuple[int, int, int]) -> None:
+        self.frame_main.circle((x_mid, 100), radius=4, color=color, thickness=3)
+        self.frame_main.line((x_mid-25, 10), (x_mid+25, 10), color, 2)
 
 
     def _get_analyze_state(self):
         return self.user_settings.analyze_mode
+
+
+
+    def _show_analysis(self) -> bool:
+        """
+        Whether the analysis (search area, found peaks and the reconstruction in the sub view) is drawn.
+        """
+        return self.render and self._get_analyze_state()
     
 
 
+    @property
+    def _preprocessing(self) -> str:
+        return "windowed" if self.denoiser is None else "streaming"
+
+
+
+    def _collect_prediction_windows(self, peak_indices: np.ndarray) -> Tuple[List[int], np.ndarray, List[tuple]]:
+        """
+        Gathers the transformed beat windows of all the given peaks (indices in the full signal) into one array (n_beats, FRAME_SIZE),
+        or (n_beats, n_leads, FRAME_SIZE) for many leads - the leads are preprocessed together.
+        Peaks too close to the signal start are skipped, only the windows not found in the window cache are transformed.
+        Returns the peaks, their windows and their cache entries (None for the beats not cached).
+        """
+        beat_peaks = [peak_idx for peak_idx in peak_indices if peak_idx > FRAME_SIZE // 2] # the half
+        cached = [self.window_cache.get(self._cache_key(peak_idx)) if self.window_cache is not None else None for peak_idx in beat_peaks]
+
+        windows = np.empty((len(beat_peaks),) + self._lead_shape + (FRAME_SIZE,), dtype=self.transformer.dtype)
+        missing = [i for i, entry in enumerate(cached) if entry is None]
+        for i, entry in enumerate(cached):
+            if entry is not None:
+                windows[i] = entry[0]
+
+        if missing:
+            transform = self.transformer.normalize_batch if self.denoiser is not None else self.transformer.transform_batch
+            with self.metrics.timer("transform"):
+                windows[missing] = self._transform_windows([self._get_beat_window(beat_peaks[i]) for i in missing], transform)
+        return beat_peaks, windows, cached
+
+
+
+    def _score_windows(self, beat_peaks: np.ndarray, windows: np.ndarray, cached: List[tuple]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Scores the beat windows not scored before - the errors (and reconstructions) of the beats already seen are taken from the window cache,
+        the errors of the beats already analyzed from the result store, and the new results are appended to both.
+        Only the reconstruction of the last (displayed) beat is needed for the beats scored before, and only in the analyze mode;
+        the missing reconstructions of the other beats are left as zeros.
+        All the leads of a beat are scored together, the results of every lead are stored under its own version.
+        """
+        if self.result_store is None and self.window_cache is None:
+            return self.predict_anomaly(windows)
+
+        reconstructed_signals = np.zeros_like(windows)
+        errors = np.zeros((len(beat_peaks),) + self._lead_shape, dtype=windows.dtype)
+        lead_errors = errors.reshape(len(beat_peaks), -1) # view of the errors (n_beats, n_leads) also for one lead
+        known = np.array([entry is not None and entry[2] is not None for entry in cached], dtype=bool) # error already computed
+        has_reconstruction = np.array([entry is not None and entry[1] is not None for entry in cached], dtype=bool)
+        for i in np.flatnonzero(known):
+            errors[i] = cached[i][2]
+            if has_reconstruction[i]:
+                reconstructed_signals[i] = cached[i][1]
+
+        if self.result_store is not None:
+            versions = self._lead_versions
+            rows = np.flatnonzero(~known)
+            found = np.ones((len(rows),), dtype=bool) # stored for all the leads
+            for lead, version in enumerate(versions):
+                lead_found, stored_errors, _ = self.result_store.lookup(beat_peaks[rows], version)
+                lead_errors[rows[lead_found], lead] = stored_errors[lead_found]
+                found &= lead_found
+            known[rows[found]] = True
+
+        to_predict = ~known
+        if self._show_analysis() and not has_reconstruction[-1]:
+            to_predict[-1] = True
+        if np.any(to_predict):
+            reconstructed_signals[to_predict], errors[to_predict], _ = self.predict_anomaly(windows[to_predict])
+            has_reconstruction |= to_predict
+
+        flags = (errors > self.user_settings.anomaly_threshold).astype(int)
+        if self.result_store is not None:
+            lead_flags = flags.reshape(len(beat_peaks), -1)
+            for lead, version in enumerate(versions):
+                self.result_store.append(beat_peaks[~known], lead_errors[~known, lead], lead_flags[~known, lead], version)
+        if self.window_cache is not None:
+            for i, peak_idx in enumerate(beat_peaks):
+                reconstruction = reconstructed_signals[i].copy() if has_reconstruction[i] else None
+                self.window_cache.put(self._cache_key(peak_idx), windows[i].copy(), reconstruction, errors[i].copy())
+        return reconstructed_signals, errors, flags
+
+
+
+    def _keep_beats(self, beat_peaks: List[int], beat_errors: np.ndarray, errors: np.ndarray) -> None:
+        for peak_idx, beat_error, lead_errors in zip(beat_peaks, beat_errors, errors):
+            if peak_idx not in self._scored_beats:
+                self._scored_beats.add(peak_idx)
+                self.beat_samples.append(peak_idx)
+                self.beat_errors.append(beat_error)
+                if self.multi_lead:
+                    self.beat_lead_errors.append(lead_errors)
+
+
+
+    def _known_beats(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Sample indices and errors of the beats in [start, stop) scored in this session or found in the result store
+        (the highest error of the leads for many leads). The store is read only once the model is loaded (its results are versioned by the model).
+        """
+        samples = np.asarray(self.beat_samples, dtype=np.int64)
+        errors = np.asarray(self.beat_errors, dtype=float)
+        in_range = (samples >= start) & (samples < stop)
+        samples, errors = samples[in_range], errors[in_range]
+
+        if self.result_store is not None and (self._model is not None or (MODEL_LOADER.is_ready() and MODEL_LOADER.error is None)):
+            stored = [self.result_store.read(start, stop, version) for version in self._lead_versions]
+            stored_samples, inverse = np.unique(np.concatenate([lead["sample"] for lead in stored]), return_inverse=True)
+            stored_errors = np.full((len(stored_samples),), -np.inf)
+            np.maximum.at(stored_errors, inverse, np.concatenate([lead["error"] for lead in stored]))
+            new = ~np.isin(stored_samples, samples)
+            samples = np.concatenate([samples, stored_samples[new]])
+            errors = np.concatenate([errors, stored_errors[new]])
+        return samples, errors
+
+
+
+    @property
+    def _lead_shape(self) -> tuple:
+        return (len(self.leads),) if self.multi_lead else ()
+
+
+
+    @property
+    def _lead_versions(self) -> List[str]:
+        """
+        Result versions of the leads, the first lead shares the version of the single-lead results.
+        """
+        version = self.results_version
+        return [version] + [f"{version}/lead={lead}" for lead in range(1, len(self.leads))]
+
+
+
+    def _cache_key(self, peak_idx: int) -> tuple:
+        return (self.record_id, int(peak_idx), f"{self.transformer.config_id}/{self._preprocessing}", self.model.model_id, len(self.leads))
+
+
+
+    def _get_beat_window(self, peak_idx: int) -> np.ndarray:
+        if self.multi_lead: # (n_leads, length)
+            if self.denoiser is not None:
+                return np.stack([denoiser.get(peak_idx-432, peak_idx+432) for denoiser in self.lead_denoisers])
+            return np.stack([np.asarray(lead[peak_idx-432:peak_idx+432]) for lead in self.leads])
+        if self.denoiser is not None:
+            return self.denoiser.get(peak_idx-432, peak_idx+432)
+        return self.signal[peak_idx-432:peak_idx+432]
+
+
+
+    def _transform_windows(self, windows: List[np.ndarray], transform) -> np.ndarray:
+        if all(w.shape[-1] == FRAME_SIZE for w in windows):
+            return transform(np.stack(windows))
+        return np.concatenate([transform(np.asarray(w)[np.newaxis]) for w in windows]) # windows cut by the signal end
+
+
+
+    def _get_streaming_peaks(self, height: float, max_peaks: int) -> np.ndarray:
+        """
+        Passes the cleaned samples up to the end of the analysis window to the incremental peak detector.
+        Returns the indices of the beats confirmed since the last call (possibly from the previous window), at most max_peaks of them.
+        """
+        window_end = (self.ii+1) * self.window_length
+        self.peak_detector.height = height
+        self.peak_detector.max_peaks = max_peaks
+        peak_indices = self.peak_detector.update(self.peak_denoiser.get(self.detected_until, window_end))
+        self.detected_until = window_end
+        return peak_indices
+
+
+
+    def _feed_denoiser(self, idx: int) -> None:
+        """
+        Pushes the samples needed up to the beat windows of the current analysis window into the streaming denoisers (one per lead),
+        in one chunk per analysis window. Every sample gets pushed (and denoised) exactly once.
+        """
+        target = min(idx + FRAME_SIZE // 2 + self.peak_denoiser.delay + 1, len(self.signal))
+        if target > self.peak_denoiser.n_pushed:
+            for denoiser, lead in zip(self._streamed_denoisers, self.leads):
+                denoiser.push(lead[denoiser.n_pushed:target])
+                if target == len(self.signal):
+                    denoiser.flush()
+
+
+
+    @property
+    def _streamed_denoisers(self) -> List[StreamingDenoiser]:
+        """
+        Denoisers fed with the signal - one per lead for the streaming beat preprocessing, else only the one of the peak detector.
+        """
+        return self.lead_denoisers if self.denoiser is not None else [self.peak_denoiser]
+
+
+
+    def _new_denoiser(self) -> StreamingDenoiser:
+        return StreamingDenoiser(self.transformer.fs, self.transformer.hz_threshold, self.transformer.wiener_size, dtype=self.transformer.dtype)
+
+
+
     def _get_n_highest_peaks(self, signal, n: int, height: float, distance: int) -> np.ndarray:
         res = find_peaks(signal, height=height, distance=distance)
         n_highest = np.argsort(res[1]["peak_heights"])[-n:]
         return res[0][n_highest]
     
-
-    def __warm_up_model(self):
-        self.model.predict(np.zeros((FRAME_SIZE,)), 0.5)
-        self.model.predict(np.ones((FRAME_SIZE,)), 0.5)
-    
     
     
\ No newline at end of file
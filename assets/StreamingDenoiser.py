@@ -0,0 +1,140 @@
+import numpy as np
+from scipy.signal import firwin, lfilter, lfilter_zi
+
+
+
+class StreamingDenoiser:
+    """
+    Causal counterpart of the SignalTransformer FFT + Wiener denoising for the live signal path.
+    Every incoming sample is denoised exactly once: a linear phase FIR low-pass replaces the FFT cut-off,
+    followed by a Wiener filter on the running local mean and variance, with the noise power tracked as
+    an exponential moving average of the local variance.
+    The cleaned signal is kept in a ring buffer, addressed by the index of the original sample
+    (the filter delay is compensated).
+
+    Parameters
+    ----------
+    fs : int
+        The sampling frequency of the signal.
+    hz_threshold : int
+        The cut-off frequency of the low-pass filter.
+    wiener_size : int
+        The size of the Wiener filter window.
+    numtaps : int
+        The number of the FIR filter taps (odd).
+    noise_window : int
+        The time constant (in samples) of the noise power estimate.
+    capacity : int
+        The number of cleaned samples kept in the ring buffer.
+    dtype : str
+        The floating point type of the cleaned samples (the filters run in double precision,
+        the running sums over long chunks would lose too much precision in float32).
+    """
+
+    def __init__(self, fs: int = 360, hz_threshold: int = 40, wiener_size: int = 9, numtaps: int = 31,
+                 noise_window: int = 864, capacity: int = 4096, dtype: str = "float64"):
+        if numtaps % 2 == 0:
+            raise ValueError('Number of the FIR filter taps must be odd.')
+        self.wiener_size = wiener_size
+        self.capacity = capacity
+        self.delay = (numtaps - 1) // 2 + (wiener_size - 1) // 2 # samples between input and cleaned output
+
+        self._taps = firwin(numtaps, hz_threshold, fs=fs)
+        self._noise_coefs = ([1 / noise_window], [1, 1 / noise_window - 1])
+        self._fir_state = None
+        self._noise_state = None
+        self._history = np.zeros((wiener_size - 1,)) # last low-passed samples of the previous chunk
+
+        self._last_sample = 0.0
+        self._buffer = np.zeros((capacity,), dtype=dtype)
+        self.n_pushed = 0 # number of samples pushed so far
+        self._start = 0 # index of the first cleaned sample since the last reset
+
+
+
+    @property
+    def available(self) -> int:
+        """
+        Index (exclusive) of the last cleaned sample in the ring buffer.
+        """
+        return max(self.n_pushed - self.delay, 0)
+
+
+
+    def push(self, samples: np.ndarray) -> None:
+        """
+        Denoises the given new samples and appends them to the ring buffer.
+        """
+        samples = np.atleast_1d(np.asarray(samples, dtype=float))
+        if len(samples) == 0:
+            return
+
+        if self._fir_state is None: # starting from the first sample value instead of zeros
+            self._fir_state = lfilter_zi(self._taps, 1.0) * samples[0]
+            self._history[:] = samples[0]
+        filtered, self._fir_state = lfilter(self._taps, 1.0, samples, zi=self._fir_state)
+
+        # running local mean and variance over the trailing Wiener window
+        extended = np.concatenate([self._history, filtered])
+        sums = np.cumsum(np.concatenate([[0.0], extended]))
+        squared_sums = np.cumsum(np.concatenate([[0.0], extended ** 2]))
+        local_mean = (sums[self.wiener_size:] - sums[:-self.wiener_size]) / self.wiener_size
+        local_var = np.maximum((squared_sums[self.wiener_size:] - squared_sums[:-self.wiener_size]) / self.wiener_size - local_mean ** 2, 0)
+
+        if self._noise_state is None:
+            self._noise_state = lfilter_zi(*self._noise_coefs) * local_var[0]
+        noise, self._noise_state = lfilter(*self._noise_coefs, local_var, zi=self._noise_state)
+
+        centre = extended[(self.wiener_size - 1) // 2:][:len(samples)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cleaned = (centre - local_mean) * (1 - noise / local_var) + local_mean
+        cleaned = np.where(local_var < noise, local_mean, cleaned)
+
+        self._history = extended[len(extended) - (self.wiener_size - 1):]
+        self._last_sample = samples[-1]
+        self._write(cleaned)
+
+
+
+    def flush(self) -> None:
+        """
+        Pushes the last sample repeatedly, so the delayed end of the signal gets out of the filters.
+        """
+        if self.n_pushed > 0:
+            self.push(np.full((self.delay,), self._last_sample))
+
+
+
+    def reset(self, offset: int = 0) -> None:
+        """
+        Clears the filter states, the next pushed samples start at the given index of the original signal (e.g. after a seek).
+        """
+        self._fir_state = None
+        self._noise_state = None
+        self.n_pushed = offset
+        self._start = offset
+
+
+
+    def get(self, start: int, stop: int) -> np.ndarray:
+        """
+        Returns the cleaned samples [start, stop) of the original signal indexing.
+        The range is clipped to the samples still kept in the ring buffer.
+        """
+        start = max(start, self.available - self.capacity, self._start)
+        stop = min(stop, self.available)
+        if stop <= start:
+            return np.empty((0,), dtype=self._buffer.dtype)
+
+        positions = np.arange(start + self.delay, stop + self.delay) % self.capacity
+        return self._buffer[positions]
+
+
+
+    def _write(self, cleaned: np.ndarray) -> None:
+        if len(cleaned) > self.capacity:
+            self.n_pushed += len(cleaned) - self.capacity
+            cleaned = cleaned[-self.capacity:]
+        positions = np.arange(self.n_pushed, self.n_pushed + len(cleaned)) % self.capacity
+        self._buffer[positions] = cleaned
+        self.n_pushed += len(cleaned)
@@ -0,0 +1,104 @@
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d
+from scipy.signal import find_peaks
+
+from assets.settings import *
+
+
+
+class StreamingPeakDetector:
+    """
+    Incremental R-peak detector for a denoised signal arriving in chunks.
+    Keeps a short trailing context between the calls, so the peaks straddling the chunk boundaries are found,
+    and the refractory distance is kept across the chunks. Every beat is emitted exactly once,
+    with its absolute sample index, as soon as no higher peak within the refractory distance can follow.
+
+    Parameters
+    ----------
+    height : float
+        The peak height threshold on the signal normalized over the trailing context of every sample.
+    distance : int
+        The refractory distance between two beats (in samples).
+    context : int
+        The number of the past samples (up to the sample itself) used for the normalization.
+    max_peaks : int
+        The maximal number of the beats emitted by one update (the highest ones), None for no limit.
+    """
+
+    def __init__(self, height: float = DEFAULT_PEAK_THRESHOLD, distance: int = 72, context: int = FRAME_SIZE, max_peaks: int = None):
+        self.height = height
+        self.distance = distance
+        self.context = context
+        self.max_peaks = max_peaks
+
+        self._buffer = np.empty((0,))
+        self._offset = 0 # absolute index of the first buffered sample
+        self._confirmed_until = 0 # absolute index up to which the beats are already emitted
+        self._last_beat = -distance
+
+
+
+    def update(self, samples: np.ndarray) -> np.ndarray:
+        """
+        Consumes the new samples and returns the absolute indices of the newly confirmed beats (at most max_peaks of them).
+        """
+        self._buffer = np.concatenate([self._buffer, samples])
+        end = self._offset + len(self._buffer)
+
+        beats = np.empty((0,), dtype=np.int64)
+        if len(self._buffer) > 0:
+            # the threshold of every sample is relative to the range of its own trailing context, so it does not depend on the chunk sizes
+            rolling_min = minimum_filter1d(self._buffer, self.context, origin=(self.context - 1) // 2)
+            rolling_max = maximum_filter1d(self._buffer, self.context, origin=(self.context - 1) // 2)
+            peaks, properties = find_peaks(self._buffer, height=rolling_min + self.height * (rolling_max - rolling_min), distance=self.distance)
+            peaks, heights = peaks + self._offset, properties["peak_heights"]
+
+            # the peaks close to the end may still be suppressed by a higher one in the next chunk
+            confirmed = (peaks >= self._confirmed_until) & (peaks < end - self.distance)
+            beats = self._apply_refractory(peaks[confirmed], heights[confirmed])
+
+        self._confirmed_until = max(end - self.distance, self._confirmed_until)
+        self._trim()
+        return beats
+
+
+
+    def reset(self, offset: int = 0) -> None:
+        """
+        Clears the state, the next samples start at the given absolute index.
+        """
+        self._buffer = np.empty((0,))
+        self._offset = offset
+        self._confirmed_until = offset
+        self._last_beat = offset - self.distance
+
+
+
+    def _apply_refractory(self, peaks: np.ndarray, heights: np.ndarray) -> np.ndarray:
+        """
+        Keeps the max_peaks highest of the peaks far enough from the last emitted beat, and of them the ones far enough from each other.
+        The cap goes first, so no dropped peak rejects a later one.
+        """
+        far = peaks - self._last_beat >= self.distance
+        peaks, heights = peaks[far], heights[far]
+        if self.max_peaks is not None and len(peaks) > self.max_peaks:
+            peaks = np.sort(peaks[np.argsort(heights)[-self.max_peaks:]])
+
+        kept, last_beat = [], self._last_beat
+        for p in peaks:
+            if p - last_beat >= self.distance:
+                kept.append(p)
+                last_beat = p
+
+        beats = np.asarray(kept, dtype=np.int64)
+        if len(beats) > 0:
+            self._last_beat = beats[-1]
+        return beats
+
+
+
+    def _trim(self) -> None:
+        keep = self.context + 2 * self.distance # the trailing context of every not yet confirmed sample stays buffered
+        if len(self._buffer) > keep:
+            self._offset += len(self._buffer) - keep
+            self._buffer = self._buffer[-keep:]
@@ -0,0 +1,151 @@
+import numpy as np
+import os
+import wfdb
+from typing import Dict
+
+
+
+class WfdbReader:
+    """
+    Memory-mapped reader of WFDB records (format 16 and 212 signal files).
+    Only the header is parsed when opening, the samples of the requested channel and range are decoded on demand,
+    so arbitrarily long (e.g. 24-48 h Holter) records can be streamed through with bounded memory.
+
+    Parameters
+    ----------
+    path : str
+        The path of the record (.hea without the extension).
+    dtype : str
+        The floating point type of the decoded physical values.
+    """
+
+    SUPPORTED_FORMATS = ("16", "212")
+
+    def __init__(self, path: str, dtype: str = "float64"):
+        header = wfdb.rdheader(path)
+        directory = os.path.dirname(path)
+
+        if any(fmt not in self.SUPPORTED_FORMATS for fmt in header.fmt):
+            raise ValueError(f'Only the formats {self.SUPPORTED_FORMATS} are supported, got {header.fmt}.')
+        if any(spf not in (None, 1) for spf in (header.samps_per_frame or [])):
+            raise ValueError('Multi-frequency records are not supported.')
+
+        self.fs = header.fs
+        self.n_samples = header.sig_len
+        self.n_channels = header.n_sig
+        self.sig_name = header.sig_name
+        self.dtype = np.dtype(dtype)
+
+        self._files: Dict[str, np.memmap] = {}
+        self._channels = []
+        for c in range(header.n_sig):
+            file_name = header.file_name[c]
+            file_channels = [i for i in range(header.n_sig) if header.file_name[i] == file_name]
+            byte_offset = (header.byte_offset[c] or 0) if header.byte_offset else 0
+            if file_name not in self._files:
+                self._files[file_name] = np.memmap(os.path.join(directory, file_name), dtype=np.uint8, mode="r", offset=byte_offset)
+
+            self._channels.append({
+                "file": file_name,
+                "fmt": header.fmt[c],
+                "position": file_channels.index(c), # position of the channel in the interleaved frame
+                "n_file_channels": len(file_channels),
+                "baseline": header.baseline[c],
+                "gain": header.adc_gain[c],
+            })
+
+
+
+    def channel(self, channel: int = 0) -> "ChannelView":
+        """
+        Returns the lazy array-like view of the given channel.
+        """
+        return ChannelView(self, channel)
+
+
+
+    def read(self, channel: int, start: int, stop: int) -> np.ndarray:
+        """
+        Decodes the physical values of the samples [start, stop) of the given channel.
+        """
+        start, stop = max(start, 0), min(stop, self.n_samples)
+        if stop <= start:
+            return np.empty((0,), dtype=self.dtype)
+
+        info = self._channels[channel]
+        data = self._files[info["file"]]
+        n = info["n_file_channels"]
+
+        if info["fmt"] == "16":
+            digital = data[2*start*n:2*stop*n].view("<i2").reshape(-1, n)[:, info["position"]]
+        else:
+            digital = self._decode_212(data, start * n, stop * n).reshape(-1, n)[:, info["position"]]
+
+        return (digital.astype(self.dtype) - self.dtype.type(info["baseline"])) / self.dtype.type(info["gain"])
+
+
+
+    def _decode_212(self, data: np.memmap, first: int, last: int) -> np.ndarray:
+        """
+        Decodes the interleaved samples [first, last) of a format 212 file (pairs of 12-bit samples packed in 3 bytes).
+        """
+        pair_first, pair_last = first // 2, (last + 1) // 2
+        packed = np.asarray(data[3*pair_first:3*pair_last])
+        if len(packed) % 3: # odd total number of samples, the last pair is stored in 2 bytes
+            packed = np.concatenate((packed, np.zeros(3 - len(packed) % 3, dtype=np.uint8)))
+        packed = packed.reshape(-1, 3).astype(np.int16)
+
+        samples = np.empty((len(packed), 2), dtype=np.int16)
+        samples[:, 0] = packed[:, 0] | ((packed[:, 1] & 0x0F) << 8)
+        samples[:, 1] = packed[:, 2] | ((packed[:, 1] & 0xF0) << 4)
+        samples[samples > 2047] -= 4096 # 12-bit two's complement
+
+        return samples.reshape(-1)[first - 2*pair_first:last - 2*pair_first]
+
+
+
+class ChannelView:
+    """
+    Lazy array-like view of one channel of a WfdbReader, supports len(), integer indexing and slicing (without step).
+    Single samples are served from a cached decoded block.
+    """
+
+    BLOCK_SIZE = 4096
+
+    def __init__(self, reader: WfdbReader, channel: int):
+        self.reader = reader
+        self.channel = channel
+        self.fs = reader.fs
+
+        self._block_start = 0
+        self._block = np.empty((0,), dtype=reader.dtype)
+
+
+
+    def __len__(self) -> int:
+        return self.reader.n_samples
+
+
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('Slicing with a step is not supported.')
+            return self.reader.read(self.channel, start, stop)
+
+        idx = int(key)
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('Sample index out of range.')
+        if not self._block_start <= idx < self._block_start + len(self._block):
+            self._block_start = idx
+            self._block = self.reader.read(self.channel, idx, idx + self.BLOCK_SIZE)
+        return self._block[idx - self._block_start]
+
+
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        signal = self.reader.read(self.channel, 0, len(self))
+        return signal if dtype is None else signal.astype(dtype)
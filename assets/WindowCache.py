@@ -0,0 +1,84 @@
+import numpy as np
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+
+class WindowCache:
+    """
+    Bounded LRU cache of the per-beat computations (transformed window, reconstruction, error),
+    so replaying, rewinding or toggling the analysis over already seen beats does not transform and score them again.
+    The least recently used beats are evicted once the arrays held exceed the memory budget.
+
+    Parameters
+    ----------
+    max_bytes : int
+        The memory budget of the cached arrays.
+    """
+
+    ENTRY_OVERHEAD = 256 # approximate bytes of the key, tuple and array headers of one entry
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Hashable, Tuple[np.ndarray, Optional[np.ndarray], Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+
+    def get(self, key: Hashable) -> Optional[Tuple[np.ndarray, Optional[np.ndarray], Optional[float]]]:
+        """
+        Returns the cached (window, reconstruction, error) of the beat, or None. The reconstruction and error may be None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+
+
+    def put(self, key: Hashable, window: np.ndarray, reconstruction: np.ndarray = None, error: float = None) -> None:
+        """
+        Caches the computations of the beat, replacing the previous entry of the key, and evicts the least recently used beats over the budget.
+        """
+        entry = (window, reconstruction, error)
+        size = self._size(entry)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.n_bytes -= self._size(previous)
+            self._entries[key] = entry
+            self.n_bytes += size
+
+            while self.n_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.n_bytes -= self._size(evicted)
+
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.n_bytes = 0
+
+
+
+    def _size(self, entry: Tuple[np.ndarray, Optional[np.ndarray], Optional[float]]) -> int:
+        window, reconstruction, _ = entry
+        return self.ENTRY_OVERHEAD + window.nbytes + (reconstruction.nbytes if reconstruction is not None else 0)
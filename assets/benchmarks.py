@@ -0,0 +1,185 @@
+import numpy as np
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable
+
+from assets.transformation_functions import SignalTransformer
+from assets.SignalHandler import SignalHandler
+from assets.ScrollingFrame import ScrollingFrame
+from assets.drawing_functions import draw_signal, fill_between
+from assets.settings import *
+from models.AnomalyDetector import AnomalyDetector
+
+
+
+def time_calls(function: Callable[[], object], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    """
+    Times the repeated calls of the function, returns the statistics of the call time in seconds.
+    """
+    for _ in range(warmup):
+        function()
+
+    times = np.empty((repeat,))
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times[i] = time.perf_counter() - start
+
+    return {"calls": repeat, "min_s": float(times.min()), "median_s": float(np.median(times)), "mean_s": float(times.mean()),
+            "max_s": float(times.max())}
+
+
+
+def beat_windows(signal: np.ndarray, n_windows: int) -> np.ndarray:
+    """
+    Cuts n_windows consecutive raw windows (n_windows, FRAME_SIZE) from the signal, repeating it if too short,
+    so the batch sizes do not depend on the signal length.
+    """
+    return np.resize(np.asarray(signal[:n_windows * FRAME_SIZE]), n_windows * FRAME_SIZE).reshape(n_windows, FRAME_SIZE)
+
+
+
+def bench_transform(signal: np.ndarray, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    SignalTransformer on one analysis window, one beat window and a batch of beat windows.
+    """
+    transformer = SignalTransformer()
+    analysis_window = signal[:FRAME_SIZE // 2]
+    beat_window = signal[:FRAME_SIZE]
+    batch = beat_windows(signal, 256)
+
+    results = {
+        "transform_signal[analysis_window]": time_calls(lambda: transformer.transform_signal(analysis_window), repeat),
+        "transform_signal[beat_window]": time_calls(lambda: transformer.transform_signal(beat_window), repeat),
+        f"transform_batch[{len(batch)}]": time_calls(lambda: transformer.transform_batch(batch), max(repeat // 10, 3)),
+    }
+    results[f"transform_batch[{len(batch)}]"]["windows_per_s"] = len(batch) / results[f"transform_batch[{len(batch)}]"]["median_s"]
+    return results
+
+
+
+def bench_peaks(model: AnomalyDetector, signal: np.ndarray, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    SignalHandler._get_n_highest_peaks on a transformed analysis window.
+    """
+    handler = SignalHandler(signal[:FRAME_SIZE], SignalTransformer(), threading.Lock(), model=model)
+    window = handler.transformer.transform_signal(signal[:FRAME_SIZE // 2])
+    return {"_get_n_highest_peaks": time_calls(lambda: handler._get_n_highest_peaks(window, DEFAULT_MAX_PEAKS, DEFAULT_PEAK_THRESHOLD, 10), repeat)}
+
+
+
+def bench_predict(model: AnomalyDetector, signal: np.ndarray, batch_sizes: Iterable[int], repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    AnomalyDetector.predict at the given batch sizes.
+    """
+    windows = SignalTransformer().transform_batch(beat_windows(signal, max(batch_sizes)))
+
+    results = {}
+    for batch_size in batch_sizes:
+        batch = windows[:batch_size]
+        result = time_calls(lambda: model.predict(batch, DEFAULT_THRESHOLD), max(repeat // batch_size, 3))
+        result["windows_per_s"] = len(batch) / result["median_s"]
+        results[f"predict[{len(batch)}]"] = result
+    return results
+
+
+
+def bench_drawing(signal: np.ndarray, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    The drawing helpers of the sub view and of the main view.
+    """
+    transformer = SignalTransformer()
+    window, predicted = transformer.transform_batch(beat_windows(signal, 2))
+    sub_frame = np.zeros((SUB_WINDOW_SHAPE[1], SUB_WINDOW_SHAPE[0], 3), dtype=np.uint8)
+    frame = ScrollingFrame(HEIGHT, WIDTH)
+
+    def scroll_column():
+        frame.advance(int(SCALE_X))
+        frame.vertical_line(WIDTH - 1, 100, 140, (11, 212, 11))
+
+    return {
+        "draw_signal": time_calls(lambda: draw_signal(sub_frame, window, (0, 255, 0)), repeat),
+        "fill_between": time_calls(lambda: fill_between(sub_frame, predicted, window, (255, 255, 255), column_step=1), repeat),
+        "ScrollingFrame.advance+vertical_line": time_calls(scroll_column, repeat),
+        "ScrollingFrame.compose": time_calls(frame.compose, repeat),
+    }
+
+
+
+def bench_update_signal_frame(model: AnomalyDetector, signal: np.ndarray, streaming: bool = False) -> Dict[str, float]:
+    """
+    End-to-end throughput of SignalHandler.update_signal_frame over the whole signal (analysis mode on, no result store nor cache).
+    """
+    handler = SignalHandler(signal, SignalTransformer(), threading.Lock(), model=model, streaming=streaming)
+    handler.toggle_analysis()
+
+    start = time.perf_counter()
+    handler.update_signal_range(1, len(signal))
+    elapsed = time.perf_counter() - start
+
+    n_samples = len(signal) - 1
+    return {"samples": n_samples, "beats": len(handler.beat_errors), "total_s": elapsed, "samples_per_s": n_samples / elapsed,
+            "realtime_factor": n_samples / elapsed / SAMPLING_RATE}
+
+
+
+def run_benchmarks(model: AnomalyDetector, signal: np.ndarray, batch_sizes: Iterable[int] = (1, 8, 64, 512),
+                   repeat: int = 200, end_to_end: bool = True) -> Dict[str, Dict[str, float]]:
+    """
+    Runs the whole suite on the given signal, returns the results of every benchmark by its name.
+    """
+    results = {}
+    results.update(bench_transform(signal, repeat))
+    results.update(bench_peaks(model, signal, repeat))
+    results.update(bench_predict(model, signal, batch_sizes, repeat))
+    results.update(bench_drawing(signal, repeat))
+    if end_to_end:
+        results["update_signal_frame"] = bench_update_signal_frame(model, signal)
+        results["update_signal_frame[streaming]"] = bench_update_signal_frame(model, signal, streaming=True)
+    return results
+
+
+
+def environment_info(model: AnomalyDetector) -> Dict[str, str]:
+    """
+    Describes the version and machine the benchmarks were run on, to tell the compared result files apart.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+
+    return {"date": datetime.now().isoformat(timespec="seconds"), "commit": commit, "python": platform.python_version(),
+            "numpy": np.__version__, "machine": platform.machine(), "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(), "backend": model.backend, "model_id": model.model_id, "dtype": SIGNAL_DTYPE}
+
+
+
+def save_results(path: str, info: Dict[str, str], results: Dict[str, Dict[str, float]]) -> None:
+    with open(path, "w") as f:
+        json.dump({"info": info, "results": results}, f, indent=2)
+
+
+
+def compare_results(baseline_path: str, results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """
+    Speed-up of every benchmark against the results saved in the baseline file (> 1 is faster).
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+
+    speedups = {}
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        if "median_s" in result and "median_s" in baseline[name]:
+            speedups[name] = baseline[name]["median_s"] / result["median_s"]
+        elif "samples_per_s" in result and "samples_per_s" in baseline[name]:
+            speedups[name] = result["samples_per_s"] / baseline[name]["samples_per_s"]
+    return speedups
@@ -0,0 +1,54 @@
+import numpy as np
+import cv2
+
+
+
+def signal_to_points(signal: np.ndarray, h: int, w: int) -> np.ndarray:
+    """
+    Maps the signal in the range [0, 1] to the pixel coordinates of an image of the given size.
+
+    Parameters
+    ----------
+    signal : np.ndarray
+        The signal normalized to the range [0, 1].
+    h : int
+        The image height.
+    w : int
+        The image width, the signal is stretched (or squeezed) over all of the columns.
+
+    Returns
+    -------
+    points : np.ndarray
+        The polyline points in the cv2 format (n_points, 1, 2).
+    """
+    n = len(signal)
+    x = np.arange(n) * (w - 1) / max(n - 1, 1)
+    y = (1 - np.clip(signal, 0, 1)) * (h - 1)
+    return np.round(np.stack([x, y], axis=-1)).astype(np.int32).reshape(-1, 1, 2)
+
+
+
+def draw_signal(image: np.ndarray, signal: np.ndarray, color: tuple, thickness: int = 1) -> None:
+    """
+    Draws the whole signal as one polyline over the full width of the image.
+    """
+    h, w = image.shape[:2]
+    cv2.polylines(image, [signal_to_points(signal, h, w)], False, color, thickness, cv2.LINE_AA)
+
+
+
+def fill_between(image: np.ndarray, signal_a: np.ndarray, signal_b: np.ndarray, color: tuple, column_step: int = 1) -> None:
+    """
+    Fills the area between two signals with vertical lines on every column_step-th column of the image.
+    """
+    h, w = image.shape[:2]
+    columns = np.arange(0, w, column_step)
+    positions = columns * (len(signal_a) - 1) / max(w - 1, 1)
+
+    y_a = (1 - np.clip(np.interp(positions, np.arange(len(signal_a)), signal_a), 0, 1)) * (h - 1)
+    y_b = (1 - np.clip(np.interp(positions, np.arange(len(signal_b)), signal_b), 0, 1)) * (h - 1)
+
+    rows = np.arange(h)[:, np.newaxis]
+    mask = (rows >= np.round(np.minimum(y_a, y_b))) & (rows <= np.round(np.maximum(y_a, y_b)))
+    ys, xs = np.nonzero(mask)
+    image[ys, columns[xs]] = color
@@ -7,6 +7,32 @@ SCALE_Y = HEIGHT
 DEFAULT_THRESHOLD = 0.005748231
 DEFAULT_PEAK_THRESHOLD = 0.8
 DEFAULT_MAX_PEAKS = 3
+COLOR_SCALE = 0.015 / DEFAULT_THRESHOLD # reconstruction error of the full red annotation color, relative to the anomaly threshold
+
+MODEL_PATH = "models/final_model.keras"
+MODEL_BACKEND = "keras" # inference backend of the model - "keras", "numpy" or "onnx"
+MODEL_SERVER_ADDRESS = None # (host, port) or unix socket path of a running inference server (serve.py), None for the in-process model
+MODEL_SERVER_AUTHKEY_FILE = "~/.ecg-anomaly-detection/server.key" # random key generated by the server on its first start (or set ECG_SERVER_AUTHKEY)
+
+STREAMING_DENOISING = False # denoising every sample once on the live path instead of the windowed FFT + Wiener
+STREAMING_PEAKS = False # finding the beats incrementally across the analysis windows instead of in every window on its own (always on with STREAMING_DENOISING)
+MULTI_LEAD = False # scoring all the leads of the loaded record together instead of the first one only
+
+RESULT_STORE_DIR = "results/store" # directory of the per-record result stores, None to not keep the results
+
+WINDOW_CACHE_BYTES = 64 * 2**20 # memory budget of the cached beat windows and reconstructions
+
+SIGNAL_DTYPE = "float32" # floating point type of the signals, beat windows and model inputs - "float32" or "float64"
+
+SAMPLING_RATE = 360 # Hz, sampling frequency of the signals without a record header (synthetic ones), the records play at their own
+DISPLAY_FPS = 30 # repaints per second of the views
+PLAYBACK_SPEEDS = (1, 2, 5, 10, 20, 50, 100, 0) # playback speeds relative to real time, 0 - as fast as possible
+PLAYBACK_MAX_STEP = 4 * FRAME_SIZE # samples computed at once when playing as fast as possible
+COMPUTE_QUEUE_SIZE = 8 # maximal number of the sample ranges waiting for the compute thread
+COMPUTE_MAX_LAG = 1.0 # seconds of playback the computation may fall behind before the playback is held back
+DISPLAY_MIN_FPS = 5 # repaints per second while the computation is behind
+METRICS_INTERVAL = 0.5 # seconds between the metrics panel updates and exports
+METRICS_PATH = None # Prometheus text file the latency metrics are exported to (e.g. for the node exporter textfile collector), None - no export
 
 SUB_WINDOW_SHAPE = (432, 100)
 MAIN_WINDOW_SHAPE = (864, 200)
@@ -1,15 +1,29 @@
 import numpy as np
+from functools import lru_cache
 from scipy.fftpack import fft, ifft
-from scipy.signal import wiener, resample
+from scipy.fft import rfft, irfft, rfftfreq
+from scipy.ndimage import uniform_filter1d
+from scipy.signal import resample
+
+from assets.settings import *
 
 
 class SignalTransformer:
 
-    def __init__(self, fs: int = 360, time_frame: float = 2.4, hz_threshold: int = 40, wiener_size: int = 9):
+    def __init__(self, fs: int = 360, time_frame: float = 2.4, hz_threshold: int = 40, wiener_size: int = 9, dtype: str = SIGNAL_DTYPE):
         self.fs = fs
         self.time_frame = time_frame
         self.hz_threshold = hz_threshold
         self.wiener_size = wiener_size
+        self.dtype = np.dtype(dtype) # all the outputs are of this type
+
+
+    @property
+    def config_id(self) -> str:
+        """
+        Identifies the parameters the windows are transformed with.
+        """
+        return f"fs={self.fs},hz={self.hz_threshold},wiener={self.wiener_size},{self.dtype.name}"
 
     
     def transform_signal(self, signal: np.array):
@@ -26,22 +40,63 @@ class SignalTransformer:
         transformed_signal : np.array
             The transformed signal.
         """
-        if signal.shape[0] != 864:
-            signal = resample(signal, 864)
+        return self.transform_batch(np.atleast_2d(signal))[0]
 
-        transformed_signal = self._fft_wiener_denoise(signal)
-        transformed_signal = self._normalize_signal(transformed_signal)
 
-        return transformed_signal
+    def transform_batch(self, signals: np.ndarray):
+        """
+        Transforms every row of the given array using the FFT and Wiener filter in one shot.
 
+        Parameters
+        ----------
+        signals : np.ndarray
+            The signals to transform, shape (n_signals, length) or (n_beats, n_leads, length) for the leads of multi-lead beats.
 
-    def _fft_wiener_denoise(self, signal: np.array):
+        Returns
+        -------
+        transformed_signals : np.ndarray
+            The transformed signals, shape (n_signals, 864) or (n_beats, n_leads, 864), each row normalized to the range [0, 1].
+        """
+        signals = self._resample(signals)
+
+        transformed_signals = self._fft_wiener_denoise(signals)
+        transformed_signals = self._normalize_signal(transformed_signals)
+
+        return transformed_signals
+
+
+    def normalize_batch(self, signals: np.ndarray):
+        """
+        Resamples and normalizes every row of already denoised signals (e.g. slices of the StreamingDenoiser output).
+
+        Parameters
+        ----------
+        signals : np.ndarray
+            The denoised signals, shape (n_signals, length) or (n_beats, n_leads, length).
+
+        Returns
+        -------
+        normalized_signals : np.ndarray
+            The signals of shape (n_signals, 864) or (n_beats, n_leads, 864), each row normalized to the range [0, 1].
+        """
+        return self._normalize_signal(self._resample(signals))
+
+
+    def _resample(self, signals: np.ndarray):
         """
-        Applies the FFT and Wiener filter to the given signal.
+        Casts the signals to the transformer dtype (without copying if already of that type) and resamples the rows to 864 samples.
         """
-        _, _, _, filtered_signal = self._fft_threshold(signal)
+        signals = np.asarray(signals, dtype=self.dtype)
+        if signals.shape[-1] != 864:
+            signals = resample(signals, 864, axis=-1).astype(self.dtype, copy=False)
+        return signals
+
 
-        return wiener(filtered_signal, mysize=self.wiener_size)
+    def _fft_wiener_denoise(self, signal: np.array):
+        """
+        Applies the FFT and Wiener filter to the given signal (or to every row of a 2-D array).
+        """
+        return self._wiener(self._fft_lowpass(signal))
     
 
     def _fft_threshold(self, signal: np.array):
@@ -58,10 +113,6 @@ class SignalTransformer:
         fft_signal : np.array
             The signal with the FFT applied.
         """
-        t = np.linspace(0, self.time_frame, int(self.fs*self.time_frame))
-        if self.fs == 360:
-            t = t[:-1]
-        
         fft_signal = fft(signal)
         frequencies = np.fft.fftfreq(len(fft_signal), 1/self.fs)
 
@@ -71,13 +122,54 @@ class SignalTransformer:
         filtered_signal = ifft(fft_signal_filtered)
 
         return fft_signal, fft_signal_filtered, frequencies, filtered_signal.real
+
+
+    def _fft_lowpass(self, signal: np.ndarray):
+        """
+        Cuts off the frequencies above the given threshold along the last axis.
+        Gives the same result as the real part of _fft_threshold, using the real FFT and a cached frequency mask.
+        """
+        gain = _frequency_gain(signal.shape[-1], self.fs, self.hz_threshold, self.dtype.str)
+        return irfft(rfft(signal, axis=-1) * gain, n=signal.shape[-1], axis=-1)
+
+
+    def _wiener(self, signal: np.ndarray):
+        """
+        Applies the Wiener filter along the last axis, estimating the noise power separately for every row.
+        Same as scipy.signal.wiener called on every row.
+        """
+        local_mean = uniform_filter1d(signal, self.wiener_size, axis=-1, mode="constant")
+        local_var = uniform_filter1d(signal ** 2, self.wiener_size, axis=-1, mode="constant") - local_mean ** 2
+        noise = np.mean(local_var, axis=-1, keepdims=True)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            filtered_signal = (signal - local_mean) * (1 - noise / local_var) + local_mean
+
+        return np.where(local_var < noise, local_mean, filtered_signal)
     
 
     def _normalize_signal(self, signal: np.array):
         """
-        Normalizes the signal to the range [0, 1].
+        Normalizes the signal to the range [0, 1] (every row separately for 2-D arrays).
         """
-        min_val = np.min(signal)
-        max_val = np.max(signal)
+        min_val = np.min(signal, axis=-1, keepdims=True)
+        max_val = np.max(signal, axis=-1, keepdims=True)
+
+        return (signal - min_val) / (max_val - min_val)
+
+
+
+@lru_cache(maxsize=32)
+def _frequency_gain(length: int, fs: int, hz_threshold: int, dtype: str = "<f8") -> np.ndarray:
+    """
+    Gain of the real FFT bins for the frequency cut-off, cached per (length, fs, hz_threshold, dtype).
+    Zeroing only the positive frequencies above the threshold and taking the real part of the inverse
+    halves these components, the Nyquist bin of even lengths counts as negative and stays untouched.
+    """
+    frequencies = rfftfreq(length, 1/fs)
+    gain = np.where(frequencies > hz_threshold, 0.5, 1.0).astype(dtype) # not promoting the spectrum of float32 signals
+    if length % 2 == 0:
+        gain[-1] = 1.0
 
-        return (signal - min_val) / (max_val - min_val)
\ No newline at end of file
+    gain.setflags(write=False)
+    return gain
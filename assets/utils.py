@@ -1,9 +1,10 @@
 import numpy as np
-from typing import Tuple
+from typing import List, Tuple
 import wfdb
-import cv2
 
 from assets.transformation_functions import SignalTransformer
+from assets.WfdbReader import WfdbReader, ChannelView
+from assets.drawing_functions import draw_signal
 from assets.settings import *
 
 
@@ -16,14 +17,14 @@ COLORS = {"White": (255, 255, 255),
           "Magenta": (255, 0, 255)}
 
 
-def load_full_ecg(path: str, id: str) -> Tuple[np.ndarray, np.ndarray, list]:
+def load_full_ecg(path: str, id: str, all_leads: bool = False) -> Tuple[np.ndarray, np.ndarray, list]:
     """
-    Loads the full ECG signal with the annotation from the given path and id.
+    Loads the full ECG signal with the annotation from the given path and id, the first lead (MLII) or all of them (n_samples, n_leads).
     """
     record = wfdb.rdrecord(path + id)
     ann = wfdb.rdann(path + id, "atr")
 
-    signal = record.p_signal[:, 0] # MLII
+    signal = (record.p_signal if all_leads else record.p_signal[:, 0]).astype(SIGNAL_DTYPE) # MLII first
     ann_sample = ann.sample # annotation locations
     ann_symbol = ann.symbol # annotation symbols
     
@@ -31,12 +32,79 @@ def load_full_ecg(path: str, id: str) -> Tuple[np.ndarray, np.ndarray, list]:
 
 
 
-def load_signal_ecg(path: str) -> np.ndarray:
+def load_signal_ecg(path: str, dtype: str = SIGNAL_DTYPE, all_leads: bool = False) -> np.ndarray:
     """
-    Loads the ECG signal from the given path.
+    Loads the ECG signal from the given path, the first lead or all of them (n_samples, n_leads).
     """
-    record = wfdb.rdrecord(path)
-    return record.p_signal[:, 0] # not dat but hea and without the extension
+    if all_leads:
+        return np.column_stack([np.asarray(lead) for lead in open_leads_ecg(path, dtype)])
+    return np.asarray(open_signal_ecg(path, dtype=dtype)) # not dat but hea and without the extension
+
+
+
+def open_signal_ecg(path: str, channel: int = 0, dtype: str = SIGNAL_DTYPE) -> ChannelView:
+    """
+    Opens the ECG signal from the given path without loading it, the samples are decoded from the memory-mapped file on demand.
+    Falls back to loading the channel with wfdb for the signal formats the reader does not support.
+    """
+    try:
+        return WfdbReader(path, dtype).channel(channel)
+    except ValueError:
+        return wfdb.rdrecord(path, channels=[channel]).p_signal[:, 0].astype(dtype)
+
+
+
+def open_leads_ecg(path: str, dtype: str = SIGNAL_DTYPE) -> List[ChannelView]:
+    """
+    Opens all the leads of the ECG record from the given path without loading them, as in open_signal_ecg.
+    """
+    try:
+        reader = WfdbReader(path, dtype)
+        return [reader.channel(channel) for channel in range(reader.n_channels)]
+    except ValueError:
+        signals = wfdb.rdrecord(path).p_signal.astype(dtype)
+        return [signals[:, channel] for channel in range(signals.shape[1])]
+
+
+
+def record_fs(path: str) -> float:
+    """
+    Returns the sampling frequency of the record from the given path (.hea without the extension).
+    """
+    return float(wfdb.rdheader(path).fs)
+
+
+
+def signal_extrema(signal: np.ndarray, chunk_size: int = 1 << 20) -> Tuple[float, float]:
+    """
+    Returns the minimum and maximum of the signal, reading it in chunks.
+    """
+    min_val, max_val = np.inf, -np.inf
+    for start in range(0, len(signal), chunk_size):
+        chunk = signal[start:start+chunk_size]
+        min_val, max_val = min(min_val, np.min(chunk)), max(max_val, np.max(chunk))
+    return float(min_val), float(max_val)
+
+
+
+def synthetic_ecg(n_samples: int, fs: int = SAMPLING_RATE, heart_rate: float = 75, seed: int = 0) -> np.ndarray:
+    """
+    Generates a synthetic ECG-like signal (QRS, S and T waves with a varying RR interval, noise and baseline wander),
+    used for the benchmarks and profiling when no record is at hand.
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(-int(0.1 * fs), int(0.5 * fs)) / fs # one beat template, R peak at 0
+    beat = 1.2 * np.exp(-(t / 0.012) ** 2) - 0.2 * np.exp(-((t - 0.05) / 0.02) ** 2) + 0.3 * np.exp(-((t - 0.3) / 0.05) ** 2)
+
+    signal = np.zeros((n_samples + len(beat),))
+    rr = 60 / heart_rate
+    position = 0.0
+    while position < n_samples:
+        signal[int(position):int(position) + len(beat)] += beat
+        position += fs * max(rr + 0.05 * rng.standard_normal(), 0.3)
+
+    time = np.arange(n_samples) / fs
+    return (signal[:n_samples] + 0.03 * rng.standard_normal(n_samples) + 0.1 * np.sin(2 * np.pi * 0.3 * time)).astype(SIGNAL_DTYPE)
 
 
 
@@ -49,29 +117,37 @@ def convert_signal_to_image(signal: np.ndarray, peak_idx: int, h: int, w: int, c
 
     transformed_signal = transformer.transform_signal(np.hstack([signal[peak_idx-432:peak_idx], signal[peak_idx:peak_idx+432]]))
 
-    black_image = np.ones((h, 864, 3), dtype=np.uint8) * 0
+    black_image = np.zeros((h, w, 3), dtype=np.uint8)
+    draw_signal(black_image, transformed_signal, color)
 
-    for i in range(1, len(transformed_signal)):
-        cv2.line(black_image, (i-1, int(h - h * transformed_signal[i-1])), (i, int(h - h * transformed_signal[i])), color, 1)
+    return black_image
 
-    return cv2.resize(black_image, (w, h), interpolation=cv2.INTER_LINEAR)
+
+
+def map_to_rgb(value, threshold: float = DEFAULT_THRESHOLD) -> Tuple[int, int, int]:
+    """
+    Maps the reconstruction error of a beat to its annotation color, relative to the anomaly threshold.
+    """
+    return tuple(int(c) for c in map_to_rgb_array(np.array([value]), threshold)[0])
 
 
 
-def map_to_rgb(value) -> Tuple[int, int, int]: # primitive version
+def map_to_rgb_array(values: np.ndarray, threshold: float = DEFAULT_THRESHOLD) -> np.ndarray:
+    """
+    Maps the reconstruction errors of many beats to their annotation colors (n_beats, 3) at once.
+    The error is normalized by the color scale of the threshold (0.015 at the default threshold),
+    green at zero, orange at the half of the scale and red from the full scale up.
+    """
     # normalization
-    t = value / 0.015
-    
-    if t <= 0.5:
-        # interpolation between green (0, 255, 0) and orange (255, 165, 0)
-        r = int(2 * t * 255)
-        g = int(255 - (90 * 2 * t))
-        b = 0
-    else:
-        # interpolation between orange (255, 165, 0) and red (255, 0, 0)
-        t = (t - 0.5) * 2  # normalization
-        r = 255
-        g = int(165 - (165 * t))
-        b = 0
-    
-    return (r, g, b)
+    t = np.asarray(values, dtype=np.float64) / (COLOR_SCALE * threshold)
+
+    colors = np.zeros((len(t), 3), dtype=np.int64)
+    low = t <= 0.5
+    # interpolation between green (0, 255, 0) and orange (255, 165, 0)
+    colors[low, 0] = np.trunc(2 * t[low] * 255)
+    colors[low, 1] = np.trunc(255 - (90 * 2 * t[low]))
+    # interpolation between orange (255, 165, 0) and red (255, 0, 0)
+    colors[~low, 0] = 255
+    colors[~low, 1] = np.trunc(165 - (165 * (t[~low] - 0.5) * 2))
+
+    return np.clip(colors, 0, 255)
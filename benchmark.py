@@ -0,0 +1,56 @@
+from assets.benchmarks import run_benchmarks, environment_info, save_results, compare_results
+from assets.settings import *
+from assets.utils import open_signal_ecg, synthetic_ecg
+from models.AnomalyDetector import AnomalyDetector
+from models.inference_backends import BACKENDS
+import argparse
+import os
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmarks of every pipeline stage, on a record or a synthetic signal (CPU only).")
+    parser.add_argument("-r", "--record", help="Path of the .hea record to benchmark on, a synthetic signal is generated if not given.")
+    parser.add_argument("-d", "--duration", type=float, default=300, help="Seconds of the signal used (also the synthetic signal length).")
+    parser.add_argument("-m", "--model", default=MODEL_PATH, help="Path of the anomaly detection model.")
+    parser.add_argument("--backend", choices=[*BACKENDS.keys()], default=MODEL_BACKEND, help="Inference backend of the model.")
+    parser.add_argument("-b", "--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 512], help="Batch sizes of the predict benchmarks.")
+    parser.add_argument("-n", "--repeat", type=int, default=200, help="Number of the timed calls of the fast stages.")
+    parser.add_argument("--no-end-to-end", action="store_true", help="Skip the update_signal_frame throughput benchmarks.")
+    parser.add_argument("-o", "--output", help="JSON file to save the results to.")
+    parser.add_argument("-c", "--compare", help="JSON file of earlier results to compare with.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic signal.")
+    return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    n_samples = int(args.duration * SAMPLING_RATE)
+    if args.record is not None:
+        signal = open_signal_ecg(os.path.splitext(args.record)[0])[:n_samples] # only the benchmarked samples are read
+    else:
+        signal = synthetic_ecg(n_samples, seed=args.seed)
+
+    model = AnomalyDetector(args.model, args.backend, SIGNAL_DTYPE)
+    results = run_benchmarks(model, signal, args.batch_sizes, args.repeat, not args.no_end_to_end)
+    info = environment_info(model)
+    info["signal"] = args.record or f"synthetic (seed {args.seed})"
+    info["samples"] = len(signal)
+
+    speedups = compare_results(args.compare, results) if args.compare is not None else {}
+    for name, result in results.items():
+        if "median_s" in result:
+            line = f"{name:40s} {result['median_s'] * 1e3:10.4f} ms"
+        else:
+            line = f"{name:40s} {result['samples_per_s']:10.0f} samples/s ({result['realtime_factor']:.1f}x real time)"
+        if "windows_per_s" in result:
+            line += f"  {result['windows_per_s']:.0f} windows/s"
+        if name in speedups:
+            line += f"  [{speedups[name]:.2f}x vs baseline]"
+        print(line)
+
+    if args.output is not None:
+        save_results(args.output, info, results)
+        print(f"{args.output} written")
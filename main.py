@@ -1,19 +1,71 @@
-from UI.UserInterface import UserInterface, QApplication
-import cProfile
+import argparse
+import os
 import pstats
 
-TESTS = 0
+TESTS = 0 # 1 - headless replay profiling of the pipeline instead of the GUI (same as --profile)
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ECG anomaly detection live viewer.")
+    parser.add_argument("--profile", nargs="?", const="", metavar="RECORD",
+                        help="Replays the .hea record (a synthetic signal if not given) headless as fast as possible and reports the time of every stage.")
+    parser.add_argument("--duration", type=float, help="Seconds of the record to replay when profiling (the whole record by default).")
+    parser.add_argument("--cprofile", metavar="FILE", help="Also runs the replay under cProfile and dumps the pstats to the file.")
+    parser.add_argument("--streaming", action="store_true", help="Profiles the streaming denoising mode.")
+    parser.add_argument("--streaming-peaks", action="store_true", help="Profiles the incremental peak detection with the windowed denoising.")
+    parser.add_argument("--all-leads", action="store_true", help="Scores all the leads of the record together (only the first one unless MULTI_LEAD is set).")
+    parser.add_argument("--backend", help="Inference backend of the model when profiling (MODEL_BACKEND by default).")
+    parser.add_argument("--metrics", metavar="FILE", help="Writes the latency histograms of the replay to the Prometheus text file.")
+    return parser.parse_args()
+
+
+
+def profile_replay(args) -> None:
+    import threading
+    from assets.ReplayProfiler import ReplayProfiler
+    from assets.Metrics import METRICS
+    from assets.SignalHandler import SignalHandler
+    from assets.transformation_functions import SignalTransformer
+    from assets.settings import SAMPLING_RATE, MODEL_PATH, MODEL_BACKEND, SIGNAL_DTYPE, STREAMING_DENOISING, STREAMING_PEAKS, MULTI_LEAD
+    from assets.utils import open_leads_ecg, synthetic_ecg
+    from models.AnomalyDetector import AnomalyDetector
+
+    n_samples = int(args.duration * SAMPLING_RATE) if args.duration is not None else None
+    if args.profile:
+        leads = open_leads_ecg(os.path.splitext(args.profile)[0])
+        signal = leads[0]
+    else:
+        signal = synthetic_ecg(n_samples or 30 * 60 * SAMPLING_RATE)
+        leads = [signal]
+
+    model = AnomalyDetector(MODEL_PATH, args.backend or MODEL_BACKEND, SIGNAL_DTYPE)
+    handler = SignalHandler(signal, SignalTransformer(), threading.Lock(), model=model, streaming=args.streaming or STREAMING_DENOISING,
+                            streaming_peaks=args.streaming_peaks or STREAMING_PEAKS, leads=leads if args.all_leads or MULTI_LEAD else None)
+    handler.toggle_analysis()
+
+    profiler = ReplayProfiler(handler)
+    profiler.run(n_samples, args.cprofile)
+    print(profiler.report())
+    print()
+    print(METRICS.summary())
+    if args.metrics is not None:
+        METRICS.dump(args.metrics)
+
+    if args.cprofile is not None:
+        print()
+        pstats.Stats(args.cprofile).sort_stats('cumtime').print_stats(25)
+
 
 
 if __name__ == "__main__":
-    if TESTS:
-        profiler = cProfile.Profile()
-        profiler.enable()
-        ...
-        profiler.disable()
-        stats = pstats.Stats(profiler).sort_stats('cumtime')
-        stats.print_stats()
+    args = parse_args()
+    if TESTS or args.profile is not None:
+        if args.profile is None:
+            args.profile = ""
+        profile_replay(args)
     else:
+        from UI.UserInterface import UserInterface, QApplication
         app = QApplication([])
         window = UserInterface()
         window.show()
@@ -29,5 +81,3 @@ if __name__ == "__main__":
 
 # - fix the rgb mapping function
 # - implement the UserSettings class
-
-
@@ -1,29 +1,67 @@
 import numpy as np
-from keras import models, layers
+import hashlib
 from typing import Tuple
 
+from models.inference_backends import BACKENDS
+
 
 class AnomalyDetector:
+    """
+    Auto-encoder based anomaly detector of the heartbeat windows.
+
+    Parameters
+    ----------
+    path : str
+        The path of the model file (.keras for the "keras" and "numpy" backends, .npz for "numpy", .onnx for "onnx").
+    backend : str
+        The inference backend, one of "keras", "numpy" and "onnx".
+    dtype : str
+        The floating point type of the model inputs, reconstructions and errors (the model itself computes in float32).
+    """
 
     anomaly_q001_3 = 0.0029483
     normal_q090 = 0.005748231
 
-    def __init__(self, path: str):
-        self.model = models.load_model(path, custom_objects={'LeakyReLU': layers.LeakyReLU})
+    def __init__(self, path: str, backend: str = "keras", dtype: str = "float32"):
+        if backend not in BACKENDS:
+            raise ValueError(f'Unknown backend {backend}, choose from {[*BACKENDS.keys()]}.')
+        self.backend = backend
+        self.dtype = np.dtype(dtype)
+        self.model = BACKENDS[backend](path)
+        self.model_id = _file_digest(path) # identifies the weights the results were computed with
 
 
     
     def predict(self, signal: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        reconstructed_signal = self.model.predict(self._fix_dimension(signal), verbose=0)
+        """
+        Reconstructs the given beat windows and flags the anomalies.
+        Accepts a single window (FRAME_SIZE,), a batch (n_beats, FRAME_SIZE) or a multi-lead batch (n_beats, n_leads, FRAME_SIZE),
+        all the windows are scored in one forward pass.
+
+        Returns
+        -------
+        (reconstructed_signal, error, flags) : Tuple[np.ndarray, np.ndarray, np.ndarray]
+            Reconstructions of the shape of the (at least 2-D) input, per-window reconstruction errors and flags
+            (n_beats,) or (n_beats, n_leads).
+        """
+        signal = self._fix_dimension(signal)
+        windows = signal.reshape(-1, signal.shape[-1]) # the leads of all the beats as rows of one batch
+        reconstructed_signal = np.asarray(self.model.predict(windows), dtype=self.dtype).reshape(signal.shape)
         error = self._calculate_error(signal, reconstructed_signal)
         return (reconstructed_signal, error, (error > threshold).astype(int))
 
     
 
     def _fix_dimension(self, signal: np.ndarray) -> np.ndarray:
-        return np.atleast_2d(signal)
+        return np.atleast_2d(np.asarray(signal, dtype=self.dtype)) # no copy for the inputs already of the model dtype
 
 
 
     def _calculate_error(self, X_original: np.ndarray, X_reconstructed: np.ndarray) -> np.ndarray:
-        return np.mean(np.square(X_original - X_reconstructed), axis=1)
\ No newline at end of file
+        return np.mean(np.square(X_original - X_reconstructed), axis=-1)
+
+
+
+def _file_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:16]
@@ -0,0 +1,134 @@
+import numpy as np
+import threading
+import queue
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+
+from models.AnomalyDetector import AnomalyDetector
+
+
+
+class InferenceScheduler:
+    """
+    Shared inference queue for many signal streams using one loaded model.
+    The beat windows submitted from the streams are coalesced into micro-batches, a batch is run
+    as soon as it is full or the oldest request has waited max_latency seconds,
+    and the results are routed back to the submitting streams through futures.
+    Has the same predict method as AnomalyDetector, so it can be passed as the model of a SignalHandler.
+
+    Parameters
+    ----------
+    model : AnomalyDetector
+        The shared model.
+    max_batch_size : int
+        The maximal number of beat windows in one micro-batch.
+    max_latency : float
+        The maximal time (in seconds) a request waits for the other requests to join its batch.
+    """
+
+    def __init__(self, model: AnomalyDetector, max_batch_size: int = 256, max_latency: float = 0.01):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+
+        self._requests = queue.Queue()
+        self._thread = None
+        self._running = False
+        self.n_batches = 0 # number of forward passes run so far
+        self.n_windows = 0 # number of beat windows scored so far
+
+
+
+    @property
+    def model_id(self) -> str:
+        return self.model.model_id
+
+
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+            self._thread.start()
+
+
+
+    def stop(self) -> None:
+        """
+        Stops the scheduler thread after the pending requests are scored.
+        """
+        if self._thread is not None:
+            self._running = False
+            self._requests.put(None) # waking up the thread
+            self._thread.join()
+            self._thread = None
+
+
+
+    def submit(self, signal: np.ndarray) -> Future:
+        """
+        Queues the beat windows (n_beats, FRAME_SIZE) for scoring.
+        The returned future resolves to the (reconstructed_signal, error) pair of the windows.
+        """
+        self.start()
+        future = Future()
+        self._requests.put((np.atleast_2d(signal), future))
+        return future
+
+
+
+    def predict(self, signal: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Same as AnomalyDetector.predict, waits for the micro-batch the windows were scored in.
+        """
+        signal = np.asarray(signal)
+        reconstructed_signal, error = self.submit(signal.reshape(-1, signal.shape[-1])).result()
+        if signal.ndim == 3: # multi-lead batch
+            reconstructed_signal, error = reconstructed_signal.reshape(signal.shape), error.reshape(signal.shape[:-1])
+        return (reconstructed_signal, error, (error > threshold).astype(int))
+
+
+
+    def _run(self) -> None:
+        while self._running or not self._requests.empty():
+            request = self._requests.get()
+            if request is None:
+                continue
+
+            batch = [request]
+            n_rows = len(request[0])
+            deadline = time.perf_counter() + self.max_latency
+            while n_rows < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    break
+                batch.append(request)
+                n_rows += len(request[0])
+
+            self._score(batch)
+
+
+
+    def _score(self, batch: List[Tuple[np.ndarray, Future]]) -> None:
+        try:
+            reconstructed_signals, errors, _ = self.model.predict(np.vstack([signal for signal, _ in batch]), np.inf)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        self.n_batches += 1
+        self.n_windows += len(errors)
+
+        start = 0
+        for signal, future in batch: # routing the rows back to the requests
+            stop = start + len(signal)
+            future.set_result((reconstructed_signals[start:stop], errors[start:stop]))
+            start = stop
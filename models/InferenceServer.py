@@ -0,0 +1,190 @@
+import numpy as np
+import ipaddress
+import os
+import secrets
+import socket
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client, Connection, answer_challenge, deliver_challenge
+from typing import Tuple, Union
+
+from models.AnomalyDetector import AnomalyDetector
+from models.InferenceScheduler import InferenceScheduler
+
+AUTHKEY_ENV = "ECG_SERVER_AUTHKEY" # environment variable with the key (used as is, like the content of the key file), takes precedence over the key file
+
+
+
+class InferenceServer:
+    """
+    Local out-of-process model server. Loads the model once and scores the batches of beat windows
+    sent by the clients (GUI, batch scoring, monitoring) over a local socket.
+    The requests of all the clients go through one InferenceScheduler, so they share the micro-batches.
+    The requests are unpickled, so the server listens only on the loopback interface or on a unix socket,
+    and only the clients knowing the key (see load_authkey) are accepted.
+
+    Parameters
+    ----------
+    model : AnomalyDetector
+        The model to serve.
+    address : Union[Tuple[str, int], str]
+        The (host, port) loopback address, or the path of the unix socket, to listen on.
+    authkey : bytes
+        The key the clients have to authenticate with.
+    max_batch_size : int
+        The maximal number of beat windows in one micro-batch.
+    max_latency : float
+        The maximal time (in seconds) a request waits for the other requests to join its batch.
+    """
+
+    def __init__(self, model: AnomalyDetector, address: Union[Tuple[str, int], str], authkey: bytes,
+                 max_batch_size: int = 1024, max_latency: float = 0.005):
+        if not is_local_address(address):
+            raise ValueError(f'Inference server listens only on a loopback address or a unix socket, not on {address}.')
+        self.scheduler = InferenceScheduler(model, max_batch_size, max_latency)
+        self.address = address
+        self.authkey = authkey
+
+
+
+    def serve_forever(self) -> None:
+        """
+        Accepts the clients, every connection is authenticated and served in its own thread,
+        so a client stuck in the handshake does not hold up the others. An error of the listener itself is raised.
+        """
+        self.scheduler.start()
+        with Listener(self.address) as listener:
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o600) # the socket is usable only by its owner
+            while True:
+                connection = listener.accept()
+                threading.Thread(target=self._serve_client, args=(connection,), daemon=True).start()
+
+
+
+    def _serve_client(self, connection: Connection) -> None:
+        with connection:
+            try:
+                deliver_challenge(connection, self.authkey)
+                answer_challenge(connection, self.authkey)
+            except (AuthenticationError, EOFError, OSError): # client with a wrong key or disconnected during the handshake
+                return
+
+            while True:
+                try:
+                    command, signal = connection.recv()
+                except (EOFError, OSError): # client disconnected
+                    return
+
+                if command == "model_id":
+                    response = ("ok", self.scheduler.model_id)
+                elif command != "predict":
+                    response = ("error", f"Unknown command {command}.")
+                else:
+                    try:
+                        response = ("ok", self.scheduler.submit(signal).result())
+                    except Exception as e:
+                        response = ("error", repr(e))
+                try:
+                    connection.send(response)
+                except OSError: # client disconnected during the request
+                    return
+
+
+
+class RemoteAnomalyDetector:
+    """
+    Client of the InferenceServer, with the same predict method as AnomalyDetector.
+    One connection is shared by all the threads of the client process.
+
+    Parameters
+    ----------
+    address : Union[Tuple[str, int], str]
+        The (host, port) address, or the unix socket path, of the server.
+    authkey : bytes
+        The key to authenticate with.
+    """
+
+    def __init__(self, address: Union[Tuple[str, int], str], authkey: bytes):
+        self.connection = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self.model_id = self._request("model_id", None)
+
+
+
+    def predict(self, signal: np.ndarray, threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        signal = np.atleast_2d(signal)
+        reconstructed_signal, error = self._request("predict", signal.reshape(-1, signal.shape[-1]))
+        if signal.ndim == 3: # multi-lead batch
+            reconstructed_signal, error = reconstructed_signal.reshape(signal.shape), error.reshape(signal.shape[:-1])
+        return (reconstructed_signal, error, (error > threshold).astype(int))
+
+
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+
+    def _request(self, command: str, data):
+        with self._lock:
+            self.connection.send((command, data))
+            status, result = self.connection.recv()
+
+        if status != "ok":
+            raise RuntimeError(f'Inference server error: {result}')
+        return result
+
+
+
+def parse_address(address: str) -> Union[Tuple[str, int], str]:
+    """
+    Parses the "host:port" (or just "port") address of the server, or the "unix:path" of its unix socket.
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return (host or "localhost", int(port))
+
+
+
+def is_local_address(address: Union[Tuple[str, int], str]) -> bool:
+    """
+    Whether the address is a unix socket path or a host resolving only to loopback addresses.
+    """
+    if isinstance(address, str):
+        return True
+    try:
+        infos = socket.getaddrinfo(address[0], address[1], type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        return False
+    return all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+
+def load_authkey(path: str, create: bool = False) -> bytes:
+    """
+    Reads the key shared by the inference server and its clients from the ECG_SERVER_AUTHKEY environment variable,
+    or else from the key file, which has to be readable only by its owner.
+    With create, a random key is generated into the file if it does not exist yet (done by the server on its first start).
+    """
+    if os.environ.get(AUTHKEY_ENV):
+        return os.environ[AUTHKEY_ENV].encode()
+
+    path = os.path.expanduser(path)
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError: # created meanwhile by another server
+            pass
+        else:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(f'No inference server key at {path}, start the server (serve.py) first or set {AUTHKEY_ENV}.')
+    if os.name == "posix" and os.stat(path).st_mode & 0o077:
+        raise PermissionError(f'Inference server key {path} is accessible by other users, restrict it with chmod 600.')
+    with open(path) as f:
+        return f.read().strip().encode()
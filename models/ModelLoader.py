@@ -0,0 +1,111 @@
+import numpy as np
+import threading
+from typing import Callable, List, Tuple, Union
+
+from models.AnomalyDetector import AnomalyDetector
+from models.InferenceServer import RemoteAnomalyDetector, load_authkey
+
+
+
+class ModelLoader:
+    """
+    Loads and warms up the anomaly detection model in a background thread,
+    so importing the modules and starting the GUI does not block on the model deserialization.
+
+    Parameters
+    ----------
+    path : str
+        The path of the model file.
+    backend : str
+        The inference backend of the model.
+    frame_size : int
+        The length of the beat windows used for the warm-up.
+    server_address : Union[Tuple[str, int], str]
+        The address of an inference server to connect to instead of loading the model in this process.
+    authkey_path : str
+        The file of the key to authenticate with at the inference server.
+    dtype : str
+        The floating point type of the model inputs and outputs.
+    """
+
+    def __init__(self, path: str, backend: str = "keras", frame_size: int = 864, server_address: Union[Tuple[str, int], str] = None, authkey_path: str = None,
+                 dtype: str = "float32"):
+        self.path = path
+        self.backend = backend
+        self.frame_size = frame_size
+        self.server_address = server_address
+        self.authkey_path = authkey_path
+        self.dtype = dtype
+
+        self.model = None
+        self.error = None # exception raised while loading
+        self._ready = threading.Event()
+        self._thread = None
+        self._callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+
+
+    def start(self) -> None:
+        """
+        Starts loading the model in the background, does nothing if already started.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="model-loader", daemon=True)
+                self._thread.start()
+
+
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+
+
+    def get(self, timeout: float = None) -> AnomalyDetector:
+        """
+        Returns the loaded model, starting the loading and waiting for it if needed.
+        """
+        self.start()
+        if not self._ready.wait(timeout):
+            raise TimeoutError('Model is not loaded yet.')
+        if self.error is not None:
+            raise RuntimeError('Model loading failed.') from self.error
+        return self.model
+
+
+
+    def add_ready_callback(self, callback: Callable[[], None]) -> None:
+        """
+        Registers a callback called once the loading has finished (from the loading thread, or right away if already finished).
+        """
+        with self._lock:
+            if not self._ready.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+
+
+    def _load(self) -> None:
+        try:
+            if self.server_address is not None:
+                model = RemoteAnomalyDetector(self.server_address, load_authkey(self.authkey_path))
+            else:
+                model = AnomalyDetector(self.path, self.backend, self.dtype)
+            self._warm_up(model)
+            self.model = model
+        except Exception as e:
+            self.error = e
+
+        with self._lock:
+            self._ready.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+
+    def _warm_up(self, model: AnomalyDetector) -> None:
+        model.predict(np.zeros((self.frame_size,), dtype=self.dtype), 0.5)
+        model.predict(np.ones((self.frame_size,), dtype=self.dtype), 0.5)
@@ -0,0 +1,165 @@
+import numpy as np
+import json
+import re
+import zipfile
+import io
+from scipy.special import expit
+from typing import Dict, List, Tuple
+
+
+
+class KerasBackend:
+    """
+    Runs the model through Keras (and the TensorFlow runtime).
+    """
+
+    def __init__(self, path: str):
+        from keras import models, layers # imported only when this backend is used
+        self.model = models.load_model(path, custom_objects={'LeakyReLU': layers.LeakyReLU})
+
+
+    def predict(self, signal: np.ndarray) -> np.ndarray:
+        return self.model.predict(signal, batch_size=max(len(signal), 1), verbose=0)
+
+
+
+class NumpyBackend:
+    """
+    Pure NumPy forward pass of the dense auto-encoder (Dense, LeakyReLU/sigmoid activations and BatchNormalization in inference mode).
+    Loads the weights straight from the .keras file (needs h5py), or from the .npz file written by export_numpy_weights.
+    """
+
+    def __init__(self, path: str):
+        self.layers = load_numpy_weights(path) if path.endswith(".npz") else read_keras_weights(path)
+
+
+    def predict(self, signal: np.ndarray) -> np.ndarray:
+        x = np.asarray(signal, dtype=np.float32)
+        for layer in self.layers:
+            if layer["type"] == "dense":
+                x = x @ layer["kernel"] + layer["bias"]
+                x = _activate(x, layer["activation"], layer["negative_slope"])
+            else: # batch normalization folded to scale and shift
+                x = x * layer["scale"] + layer["shift"]
+        return x
+
+
+
+class OnnxBackend:
+    """
+    Runs the model exported to ONNX (e.g. with tf2onnx) through ONNX Runtime on the CPU.
+    """
+
+    def __init__(self, path: str):
+        import onnxruntime # imported only when this backend is used
+        self.session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+
+    def predict(self, signal: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: np.asarray(signal, dtype=np.float32)})[0]
+
+
+
+BACKENDS = {"keras": KerasBackend, "numpy": NumpyBackend, "onnx": OnnxBackend}
+
+
+
+def read_keras_weights(path: str) -> List[Dict]:
+    """
+    Reads the layers of the .keras file (config.json and model.weights.h5 inside the zip archive) in the forward pass order.
+    """
+    import h5py # needed only for reading the .keras weights
+
+    with zipfile.ZipFile(path) as archive:
+        config = json.loads(archive.read("config.json"))
+        weights_file = io.BytesIO(archive.read("model.weights.h5"))
+
+    with h5py.File(weights_file, "r") as weights:
+        return [_convert_layer(layer_config, variables) for layer_config, variables in _walk_layers(config, weights["layers"])]
+
+
+
+def export_numpy_weights(keras_path: str, npz_path: str) -> None:
+    """
+    Exports the weights of the .keras file once, so the NumPy backend does not need h5py nor Keras.
+    """
+    arrays = {}
+    for i, layer in enumerate(read_keras_weights(keras_path)):
+        for key, value in layer.items():
+            arrays[f"{i}/{key}"] = np.asarray(value)
+    np.savez(npz_path, **arrays)
+
+
+
+def load_numpy_weights(path: str) -> List[Dict]:
+    """
+    Loads the layers exported with export_numpy_weights.
+    """
+    with np.load(path) as data:
+        layers = {}
+        for name in data.files:
+            i, key = name.split("/")
+            value = data[name]
+            layers.setdefault(int(i), {})[key] = value.item() if value.ndim == 0 else value
+        return [layers[i] for i in sorted(layers)]
+
+
+
+def _walk_layers(config: Dict, group) -> List[Tuple[Dict, List[np.ndarray]]]:
+    """
+    Flattens the (nested) Sequential models, pairing every layer config with its saved variables.
+    The weight groups are named after the layer classes, numbered in order within every model.
+    """
+    found, counters = [], {}
+    for layer in config["config"]["layers"]:
+        class_name = layer["class_name"]
+        if class_name == "InputLayer":
+            continue
+
+        name = re.sub(r"(?<!^)(?=[A-Z])", "_", class_name).lower()
+        count = counters.get(name, 0)
+        counters[name] = count + 1
+        layer_group = group[name if count == 0 else f"{name}_{count}"]
+
+        if class_name == "Sequential":
+            found.extend(_walk_layers(layer, layer_group["layers"]))
+        else:
+            variables = layer_group["vars"]
+            found.append((layer, [np.asarray(variables[str(i)], dtype=np.float32) for i in range(len(variables))]))
+    return found
+
+
+
+def _convert_layer(layer: Dict, variables: List[np.ndarray]) -> Dict:
+    config = layer["config"]
+    if layer["class_name"] == "Dense":
+        activation, negative_slope = config["activation"], 0.0
+        if isinstance(activation, dict): # activation layer object, e.g. LeakyReLU
+            negative_slope = activation["config"].get("negative_slope", activation["config"].get("alpha", 0.3))
+            activation = activation["class_name"].lower()
+        bias = variables[1] if config["use_bias"] else np.zeros((config["units"],), dtype=np.float32)
+        return {"type": "dense", "kernel": variables[0], "bias": bias, "activation": activation, "negative_slope": negative_slope}
+
+    if layer["class_name"] == "BatchNormalization":
+        variables = list(variables)
+        gamma = variables.pop(0) if config["scale"] else 1.0
+        beta = variables.pop(0) if config["center"] else 0.0
+        moving_mean, moving_variance = variables
+        scale = (gamma / np.sqrt(moving_variance + config["epsilon"])).astype(np.float32)
+        return {"type": "batch_normalization", "scale": scale, "shift": (beta - moving_mean * scale).astype(np.float32)}
+
+    raise ValueError(f'Layer {layer["class_name"]} is not supported by the NumPy backend.')
+
+
+
+def _activate(x: np.ndarray, activation: str, negative_slope: float) -> np.ndarray:
+    if activation == "leakyrelu":
+        return np.maximum(x, negative_slope * x)
+    if activation == "relu":
+        return np.maximum(x, 0)
+    if activation == "sigmoid":
+        return expit(x)
+    if activation == "linear":
+        return x
+    raise ValueError(f'Activation {activation} is not supported by the NumPy backend.')
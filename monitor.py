@@ -0,0 +1,61 @@
+from assets.MultiStreamMonitor import MultiStreamMonitor
+from assets.UserSettings import UserSettings
+from assets.settings import *
+from assets.utils import open_signal_ecg, record_fs
+from models.AnomalyDetector import AnomalyDetector
+from models.InferenceScheduler import InferenceScheduler
+from models.inference_backends import BACKENDS
+from models.InferenceServer import RemoteAnomalyDetector, parse_address, load_authkey
+import argparse
+import os
+import threading
+import time
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless monitoring of many ECG streams with one shared model.")
+    parser.add_argument("records", nargs="+", help="Paths of the .hea records, one stream per record.")
+    parser.add_argument("-m", "--model", default=MODEL_PATH, help="Path of the anomaly detection model.")
+    parser.add_argument("--backend", choices=[*BACKENDS.keys()], default=MODEL_BACKEND, help="Inference backend of the model.")
+    parser.add_argument("--server", help="Address (host:port or unix:PATH) of a running inference server to use instead of loading the model.")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD, help="Anomaly threshold for the reconstruction error (within 20 %% of the default).")
+    parser.add_argument("-s", "--speed", type=float, default=1.0, help="Playback speed relative to real time, 0 for as fast as possible.")
+    parser.add_argument("--max-batch-size", type=int, default=256, help="Maximal number of beats in one micro-batch.")
+    parser.add_argument("--max-latency-ms", type=float, default=10.0, help="Maximal wait of a beat for its micro-batch.")
+    args = parser.parse_args()
+    try:
+        UserSettings().set_anomaly_threshold(args.threshold) # the streams accept the same range as the GUI
+    except ValueError as e:
+        parser.error(f"-t/--threshold {args.threshold}: {e} Use a value within 20 % of {DEFAULT_THRESHOLD}.")
+    return args
+
+
+
+def load_model(args):
+    if args.server is not None:
+        return RemoteAnomalyDetector(parse_address(args.server), load_authkey(MODEL_SERVER_AUTHKEY_FILE))
+    return AnomalyDetector(args.model, args.backend, SIGNAL_DTYPE)
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    print_lock = threading.Lock()
+
+    def report_anomalies(name, peaks, errors, flags):
+        with print_lock:
+            for peak_idx, error, flag in zip(peaks, errors, flags):
+                if flag:
+                    print(f"{name}\t{peak_idx}\t{error:.6f}")
+
+    scheduler = InferenceScheduler(load_model(args), args.max_batch_size, args.max_latency_ms / 1000)
+    monitor = MultiStreamMonitor(scheduler, speed=args.speed, on_beats=report_anomalies)
+    for path in args.records:
+        path = os.path.splitext(path)[0] # not dat but hea and without the extension
+        handler = monitor.add_stream(os.path.basename(path), open_signal_ecg(path), fs=record_fs(path))
+        handler.set_model_threshold(args.threshold)
+
+    start_time = time.perf_counter()
+    monitor.run()
+    print(f"{len(args.records)} streams, {scheduler.n_windows} beats in {scheduler.n_batches} batches ({time.perf_counter() - start_time:.2f} s)")
@@ -0,0 +1,29 @@
+from assets.ResultStore import ResultStore
+from assets.settings import *
+import argparse
+import os
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Prints the per-beat results stored while analyzing a record (GUI or score.py).")
+    parser.add_argument("record", help="Path of the analyzed .hea record.")
+    parser.add_argument("--store-dir", default=RESULT_STORE_DIR, help="Root directory of the per-record result stores.")
+    parser.add_argument("--start", type=int, default=0, help="First sample of the range.")
+    parser.add_argument("--stop", type=int, help="End sample (exclusive) of the range.")
+    parser.add_argument("-a", "--anomalies", action="store_true", help="Print only the flagged beats.")
+    return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    store = ResultStore.for_record(os.path.splitext(args.record)[0], args.store_dir, read_only=True) # not dat but hea and without the extension
+    results = store.read(args.start, args.stop)
+    store.close()
+
+    print("sample\terror\tflag\tversion")
+    for sample, error, flag, version in zip(results["sample"], results["error"], results["flag"], results["version"]):
+        if flag or not args.anomalies:
+            print(f"{sample}\t{error:.6f}\t{flag}\t{store.versions[version]}")
@@ -0,0 +1,45 @@
+from assets.BatchScorer import BatchScorer, WRITERS, score_records
+from assets.settings import *
+from models.AnomalyDetector import AnomalyDetector
+from models.inference_backends import BACKENDS
+from models.InferenceServer import RemoteAnomalyDetector, parse_address, load_authkey
+import argparse
+import time
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Headless batch scoring of whole WFDB records.")
+    parser.add_argument("records", nargs="+", help="Paths of the .hea records to score.")
+    parser.add_argument("-o", "--output-dir", default="results", help="Directory for the per-record result files.")
+    parser.add_argument("-f", "--format", choices=[*WRITERS.keys()], default="csv", help="Format of the result files.")
+    parser.add_argument("-m", "--model", default=MODEL_PATH, help="Path of the anomaly detection model.")
+    parser.add_argument("--backend", choices=[*BACKENDS.keys()], default=MODEL_BACKEND, help="Inference backend of the model.")
+    parser.add_argument("--server", help="Address (host:port or unix:PATH) of a running inference server to use instead of loading the model.")
+    parser.add_argument("-t", "--threshold", type=float, default=DEFAULT_THRESHOLD, help="Anomaly threshold for the reconstruction error.")
+    parser.add_argument("-p", "--peak-threshold", type=float, default=DEFAULT_PEAK_THRESHOLD, help="Peak height threshold.")
+    parser.add_argument("--max-peaks", type=int, default=DEFAULT_MAX_PEAKS, help="Maximal number of beats kept in one analysis window.")
+    parser.add_argument("-b", "--batch-size", type=int, default=4096, help="Maximal number of beats scored in one forward pass.")
+    parser.add_argument("-s", "--streaming-peaks", action="store_true", help="Find the beats with the incremental peak detector.")
+    parser.add_argument("--store-dir", default=RESULT_STORE_DIR, help="Root directory of the per-record result stores.")
+    parser.add_argument("--no-store", action="store_true", help="Score every beat again and do not keep the results.")
+    return parser.parse_args()
+
+
+
+def load_model(args):
+    if args.server is not None:
+        return RemoteAnomalyDetector(parse_address(args.server), load_authkey(MODEL_SERVER_AUTHKEY_FILE))
+    return AnomalyDetector(args.model, args.backend, SIGNAL_DTYPE)
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    scorer = BatchScorer(load_model(args), threshold=args.threshold, peak_threshold=args.peak_threshold, max_peaks=args.max_peaks, batch_size=args.batch_size,
+                         streaming_peaks=args.streaming_peaks, store_dir=None if args.no_store else args.store_dir)
+
+    start_time = time.perf_counter()
+    for output_path in score_records(scorer, args.records, args.output_dir, args.format):
+        print(f"{output_path} written ({time.perf_counter() - start_time:.2f} s)")
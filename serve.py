@@ -0,0 +1,27 @@
+from assets.settings import *
+from models.AnomalyDetector import AnomalyDetector
+from models.InferenceServer import InferenceServer, parse_address, load_authkey
+from models.inference_backends import BACKENDS
+import argparse
+
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Local inference server sharing one warm model between the front-ends.")
+    parser.add_argument("-a", "--address", default="localhost:6000", help="Loopback address (host:port) or unix socket (unix:PATH) to listen on.")
+    parser.add_argument("-m", "--model", default=MODEL_PATH, help="Path of the anomaly detection model.")
+    parser.add_argument("--backend", choices=[*BACKENDS.keys()], default=MODEL_BACKEND, help="Inference backend of the model.")
+    parser.add_argument("--max-batch-size", type=int, default=1024, help="Maximal number of beats in one micro-batch.")
+    parser.add_argument("--max-latency-ms", type=float, default=5.0, help="Maximal wait of a beat for its micro-batch.")
+    return parser.parse_args()
+
+
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    authkey = load_authkey(MODEL_SERVER_AUTHKEY_FILE, create=True)
+    model = AnomalyDetector(args.model, args.backend, SIGNAL_DTYPE)
+    server = InferenceServer(model, parse_address(args.address), authkey, args.max_batch_size, args.max_latency_ms / 1000)
+    print(f"Serving {args.model} on {args.address}")
+    server.serve_forever()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from assets.settings import MODEL_PATH, DEFAULT_THRESHOLD, FRAME_SIZE
+from assets.transformation_functions import SignalTransformer
+from assets.utils import synthetic_ecg
+from models.AnomalyDetector import AnomalyDetector
+
+pytest.importorskip("h5py") # the NumPy backend reads the weights from the .keras file
+
+
+
+@pytest.fixture(scope="module")
+def raw_windows() -> np.ndarray:
+    """
+    Raw beat windows of a 10 min synthetic ECG, centered at its R peaks.
+    """
+    signal = synthetic_ecg(10 * 60 * 360)
+    peaks, _ = find_peaks(signal, height=0.8, distance=72)
+    peaks = peaks[(peaks >= 432) & (peaks + 432 <= len(signal))]
+    return np.stack([signal[p-432:p+432] for p in peaks])
+
+
+
+@pytest.fixture(scope="module")
+def transformed(raw_windows):
+    return {dtype: SignalTransformer(dtype=dtype).transform_batch(raw_windows) for dtype in ("float32", "float64")}
+
+
+
+def test_transform_batch_float32_within_tolerance(transformed):
+    assert transformed["float32"].dtype == np.float32 and transformed["float64"].dtype == np.float64
+    assert transformed["float32"].shape == transformed["float64"].shape
+    np.testing.assert_allclose(transformed["float32"], transformed["float64"], rtol=0, atol=2e-6)
+
+
+
+def test_predict_float32_within_tolerance(transformed):
+    reconstruction_32, error_32, flags_32 = AnomalyDetector(MODEL_PATH, "numpy", "float32").predict(transformed["float32"], DEFAULT_THRESHOLD)
+    reconstruction_64, error_64, flags_64 = AnomalyDetector(MODEL_PATH, "numpy", "float64").predict(transformed["float64"], DEFAULT_THRESHOLD)
+
+    assert reconstruction_32.dtype == error_32.dtype == np.float32
+    assert reconstruction_64.dtype == error_64.dtype == np.float64
+    assert reconstruction_32.shape == (len(transformed["float32"]), FRAME_SIZE)
+    np.testing.assert_allclose(error_32, error_64, rtol=0, atol=1e-8)
+    np.testing.assert_array_equal(flags_32, flags_64)
+    assert 0 < flags_32.sum() < len(flags_32) # the threshold splits the beats, so the flags are compared on both sides
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from scipy.signal import find_peaks
+
+from assets.settings import MODEL_PATH, DEFAULT_THRESHOLD, FRAME_SIZE
+from assets.transformation_functions import SignalTransformer
+from assets.utils import synthetic_ecg
+from models.AnomalyDetector import AnomalyDetector
+from models.inference_backends import NumpyBackend, export_numpy_weights, load_numpy_weights, read_keras_weights
+
+pytest.importorskip("h5py") # the NumPy backend reads the weights from the .keras file
+
+
+
+@pytest.fixture(scope="module")
+def numpy_model():
+    return AnomalyDetector(MODEL_PATH, "numpy")
+
+
+
+@pytest.fixture(scope="module")
+def keras_model():
+    pytest.importorskip("keras")
+    return AnomalyDetector(MODEL_PATH, "keras")
+
+
+
+def beat_windows(n_beats: int = 32) -> np.ndarray:
+    """
+    Transformed beat windows of a synthetic ECG, centered at its R peaks.
+    """
+    signal = synthetic_ecg(n_beats * 360 + FRAME_SIZE)
+    peaks, _ = find_peaks(signal, height=0.8, distance=72)
+    peaks = peaks[(peaks >= 432) & (peaks + 432 <= len(signal))][:n_beats]
+    return SignalTransformer().transform_batch(np.stack([signal[p-432:p+432] for p in peaks]))
+
+
+
+WINDOWS = {
+    "beats": beat_windows(),
+    "random": np.random.default_rng(0).random((64, FRAME_SIZE), dtype=np.float32),
+    "zeros": np.zeros((4, FRAME_SIZE), dtype=np.float32),
+    "ones": np.ones((4, FRAME_SIZE), dtype=np.float32),
+}
+
+
+
+@pytest.mark.parametrize("name", WINDOWS.keys())
+def test_numpy_backend_matches_keras(numpy_model, keras_model, name):
+    windows = WINDOWS[name]
+    keras_reconstruction, keras_error, keras_flags = keras_model.predict(windows, DEFAULT_THRESHOLD)
+    numpy_reconstruction, numpy_error, numpy_flags = numpy_model.predict(windows, DEFAULT_THRESHOLD)
+
+    np.testing.assert_allclose(numpy_reconstruction, keras_reconstruction, atol=1e-5)
+    np.testing.assert_allclose(numpy_error, keras_error, rtol=1e-5, atol=1e-8)
+    np.testing.assert_array_equal(numpy_flags, keras_flags)
+
+
+
+def test_multi_lead_batch_matches_single_leads(numpy_model):
+    windows = WINDOWS["beats"][:8].reshape(4, 2, FRAME_SIZE)
+    reconstruction, error, flags = numpy_model.predict(windows, DEFAULT_THRESHOLD)
+    flat_reconstruction, flat_error, _ = numpy_model.predict(windows.reshape(-1, FRAME_SIZE), DEFAULT_THRESHOLD)
+
+    assert reconstruction.shape == windows.shape and error.shape == flags.shape == (4, 2)
+    np.testing.assert_allclose(reconstruction.reshape(-1, FRAME_SIZE), flat_reconstruction, atol=1e-6)
+    np.testing.assert_allclose(error.ravel(), flat_error, rtol=1e-5)
+
+
+
+def test_numpy_weights_round_trip(tmp_path):
+    npz_path = str(tmp_path / "model.npz")
+    export_numpy_weights(MODEL_PATH, npz_path)
+
+    layers, loaded = read_keras_weights(MODEL_PATH), load_numpy_weights(npz_path)
+    assert len(loaded) == len(layers)
+    for layer, loaded_layer in zip(layers, loaded):
+        assert loaded_layer.keys() == layer.keys()
+        for key, value in layer.items():
+            np.testing.assert_array_equal(loaded_layer[key], value)
+
+    windows = WINDOWS["beats"]
+    np.testing.assert_array_equal(NumpyBackend(npz_path).predict(windows), NumpyBackend(MODEL_PATH).predict(windows))
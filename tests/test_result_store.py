@@ -0,0 +1,88 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from assets.ResultStore import ResultStore
+
+
+
+def append_beats(store: ResultStore, samples, version: str) -> None:
+    samples = np.asarray(samples, dtype=np.int64)
+    store.append(samples, samples / 1000, samples % 2, version)
+
+
+
+def test_reopen(tmp_path):
+    store = ResultStore(str(tmp_path), "record")
+    append_beats(store, [300, 100, 200], "model/a/windowed")
+    append_beats(store, [50, 400], "model/a/windowed")
+    store.close()
+
+    store = ResultStore(str(tmp_path), "record")
+    assert len(store) == 5
+    results = store.read(100, 400)
+    np.testing.assert_array_equal(results["sample"], [100, 200, 300])
+    np.testing.assert_allclose(results["error"], [0.1, 0.2, 0.3])
+    found, errors, flags = store.lookup(np.array([400, 401]), "model/a/windowed")
+    np.testing.assert_array_equal(found, [True, False])
+    assert errors[0] == pytest.approx(0.4) and flags[0] == 0
+    store.close()
+
+    with pytest.raises(ValueError):
+        ResultStore(str(tmp_path), "another record")
+
+
+
+def test_partial_rows(tmp_path):
+    store = ResultStore(str(tmp_path), "record")
+    append_beats(store, [100, 200], "model/a/windowed")
+    store.close()
+    with open(tmp_path / "sample.bin", "ab") as f: # an append interrupted after the first column and a half-written row
+        f.write(np.array([300], dtype=np.int64).tobytes())
+    with open(tmp_path / "error.bin", "ab") as f:
+        f.write(b"\x00\x00")
+    sizes = {name: os.path.getsize(tmp_path / f"{name}.bin") for name in ResultStore.COLUMNS}
+
+    reader = ResultStore(str(tmp_path), "record", read_only=True)
+    np.testing.assert_array_equal(reader.read()["sample"], [100, 200])
+    with pytest.raises(ValueError):
+        append_beats(reader, [300], "model/a/windowed")
+    reader.close()
+    assert {name: os.path.getsize(tmp_path / f"{name}.bin") for name in ResultStore.COLUMNS} == sizes # nothing truncated by the reader
+
+    store = ResultStore(str(tmp_path), "record")
+    append_beats(store, [300], "model/a/windowed")
+    store.close()
+    results = ResultStore(str(tmp_path), "record", read_only=True).read()
+    np.testing.assert_array_equal(results["sample"], [100, 200, 300])
+    np.testing.assert_allclose(results["error"], [0.1, 0.2, 0.3])
+
+
+
+def test_read_only_missing(tmp_path):
+    store = ResultStore(str(tmp_path / "missing"), "record", read_only=True)
+    assert len(store) == 0 and len(store.read()["sample"]) == 0
+    store.close()
+    assert not os.path.exists(tmp_path / "missing")
+
+
+
+def test_versions(tmp_path):
+    gui = ResultStore(str(tmp_path), "record") # two writers of the same store, each with its own version
+    batch = ResultStore(str(tmp_path), "record")
+    append_beats(gui, [100, 200], "model/a/streaming")
+    append_beats(batch, [100, 300], "model/a/windowed")
+    append_beats(gui, [300], "model/a/streaming")
+    gui.close()
+    batch.close()
+
+    with open(tmp_path / "meta.json") as f:
+        assert json.load(f)["versions"] == ["model/a/streaming", "model/a/windowed"]
+    store = ResultStore(str(tmp_path), "record", read_only=True)
+    np.testing.assert_array_equal(store.read(version="model/a/streaming")["sample"], [100, 200, 300])
+    np.testing.assert_array_equal(store.read(version="model/a/windowed")["sample"], [100, 300])
+    found, _, _ = store.lookup(np.array([100, 200, 300]), "model/a/windowed")
+    np.testing.assert_array_equal(found, [True, False, True])
+    assert len(store.read(version="model/b/windowed")["sample"]) == 0
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from assets.BatchScorer import BatchScorer
+from assets.StreamingPeakDetector import StreamingPeakDetector
+from assets.utils import synthetic_ecg
+
+
+
+def detect(signal: np.ndarray, chunk_size: int, **kwargs) -> np.ndarray:
+    detector = StreamingPeakDetector(distance=72, **kwargs)
+    beats = [detector.update(signal[start:start+chunk_size]) for start in range(0, len(signal), chunk_size)]
+    return np.concatenate(beats)
+
+
+
+@pytest.fixture(scope="module")
+def pulses():
+    """
+    Pulse train with a beat every 300 samples, a high spike and a drifting baseline.
+    """
+    beats = np.arange(150, 60000, 300)
+    signal = np.zeros((60000,))
+    for beat in beats:
+        signal[beat-10:beat+11] += np.hanning(21)
+    signal[30000] += 15
+    signal += 0.3 * np.sin(2 * np.pi * np.arange(len(signal)) / 7000)
+    return signal, beats
+
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 432, 4096, 60000])
+def test_chunk_size_invariance(pulses, chunk_size):
+    signal, beats = pulses
+    found = detect(signal, chunk_size)
+    np.testing.assert_array_equal(found, detect(signal, 432))
+    assert len(np.setdiff1d(beats, found)) <= 3 # only the beats next to the spike are missed
+
+
+
+def test_boundaries(pulses):
+    signal, beats = pulses
+    for shift in (-1, 0, 1): # every chunk boundary right at (or next to) a beat
+        bounds = np.concatenate([[0], beats[::3] + shift, [len(signal)]])
+        detector = StreamingPeakDetector(distance=72)
+        found = np.concatenate([detector.update(signal[start:stop]) for start, stop in zip(bounds[:-1], bounds[1:])])
+        np.testing.assert_array_equal(found, detect(signal, len(signal)))
+        assert len(np.unique(found)) == len(found)
+
+
+
+def test_max_peaks():
+    signal = np.zeros((1800,))
+    for beat, height in zip((150, 450, 750, 1050, 1350), (1.0, 0.9, 0.95, 1.0, 1.0)):
+        signal[beat-10:beat+11] += height * np.hanning(21)
+    detector = StreamingPeakDetector(distance=72, max_peaks=2)
+    np.testing.assert_array_equal(detector.update(signal[:1000]), [150, 750]) # the two highest, in order
+    np.testing.assert_array_equal(detector.update(signal[1000:]), [1050, 1350])
+
+
+
+def test_batch_scorer_chunk_size():
+    signal = synthetic_ecg(5 * 60 * 360)
+    signal[50000] += 15
+    scorer = BatchScorer(None)
+    beats = scorer.find_beats_streaming(signal, chunk_size=432)
+    for chunk_size in (1000, 65536):
+        np.testing.assert_array_equal(scorer.find_beats_streaming(signal, chunk_size=chunk_size), beats)
+    assert len(np.unique(beats)) == len(beats)